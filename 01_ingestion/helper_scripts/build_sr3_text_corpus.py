@@ -1,6 +1,8 @@
 #!/usr/bin/env python3
-import argparse, os, json, glob, subprocess
+import argparse, os, json, glob, shutil
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
+import orjson
 from pypdf import PdfReader
 
 CATEGORIES = ["core_rules", "sourcebooks", "adventures", "player_aids"]
@@ -20,23 +22,62 @@ def safe_name(path: str):
     return Path(path).stem
 
 
+def is_fresh(outputs, sources) -> bool:
+    # Outputs exist and none is older than the newest input.
+    if not outputs or not sources:
+        return False
+    try:
+        return min(os.stat(p).st_mtime for p in outputs) >= max(os.stat(p).st_mtime for p in sources)
+    except OSError:
+        return False
+
+
+def page_images(image_dir: str):
+    # One image per page stem. A directory rendered as PNG before the switch
+    # to JPG holds both; the newest file of each page wins, so no page is
+    # counted or OCR'd twice.
+    newest = {}
+    for path in glob.glob(os.path.join(image_dir, "*.jpg")) + glob.glob(os.path.join(image_dir, "*.png")):
+        stem = os.path.splitext(os.path.basename(path))[0]
+        mtime = os.stat(path).st_mtime
+        if stem not in newest or mtime > newest[stem][0]:
+            newest[stem] = (mtime, path)
+    return sorted(path for _, path in newest.values())
+
+
+def compiled_fresh(target: str, sources) -> bool:
+    # mtimes alone miss a deleted source, so the input list recorded by
+    # record_inputs() must match too.
+    try:
+        with open(target + ".inputs", encoding="utf-8") as f:
+            recorded = f.read().splitlines()
+    except OSError:
+        return False
+    return recorded == sorted(sources) and is_fresh([target], sources)
+
+
+def record_inputs(target: str, sources) -> None:
+    with open(target + ".inputs", "w", encoding="utf-8") as f:
+        f.write("".join(f"{src}\n" for src in sorted(sources)))
+
+
 def preprocess(pdf: str, out_root: str, dpi: int = 300):
     from pdf_to_images import render_pdf
     book = safe_name(pdf)
     out = os.path.join(out_root, "images", book)
+    images = page_images(out)
+    if is_fresh(images, [pdf]) and len(images) == len(PdfReader(pdf).pages):
+        return {"pdf": pdf, "pages": len(images), "images": images, "skipped": True}
     return render_pdf(pdf, out, dpi)
 
 
-def deepseek_ocr(image_dir: str, out_root: str):
-    script = os.path.join(os.path.dirname(__file__), "ocr_with_deepseek.py")
+def deepseek_ocr(tokenizer, model, image_dir: str, out_root: str):
+    from ocr_with_deepseek import ocr_images
     book = os.path.basename(image_dir)
     out = os.path.join(out_root, "ocr", book)
-    cmd = [
-        "python", script,
-        "--images", os.path.join(image_dir, "*.png"),
-        "--out", out,
-    ]
-    return subprocess.run(cmd, capture_output=True, text=True)
+    images = page_images(image_dir)
+    done, errors = ocr_images(tokenizer, model, images, out)
+    return {"book": book, "images": len(images), "done": done, "errors": errors[:20]}
 
 
 def compile_texts(pdf: str, out_root: str):
@@ -49,27 +90,48 @@ def compile_texts(pdf: str, out_root: str):
     # preferred: OCR markdown outputs
     md_files = sorted(glob.glob(os.path.join(ocr_dir, "**", "*.md"), recursive=True))
     if md_files:
+        if compiled_fresh(target, md_files):
+            return {"book": book, "compiled": target, "source": "deepseek_markdown", "skipped": True}
         with open(target, "w", encoding="utf-8") as w:
             for md in md_files:
                 w.write(f"\n\n===== {os.path.basename(md)} =====\n")
-                w.write(open(md, encoding="utf-8", errors="ignore").read())
+                with open(md, encoding="utf-8", errors="ignore") as r:
+                    shutil.copyfileobj(r, w, 1 << 20)
+        record_inputs(target, md_files)
         return {"book": book, "compiled": target, "source": "deepseek_markdown"}
 
     # fallback: pypdf extraction
+    if compiled_fresh(target, [pdf]):
+        return {"book": book, "compiled": target, "source": "pypdf_fallback", "skipped": True}
     reader = PdfReader(pdf)
     with open(target, "w", encoding="utf-8") as w:
         for i, p in enumerate(reader.pages, start=1):
             txt = p.extract_text() or ""
             w.write(f"\n\n===== PAGE {i} =====\n{txt}")
+    record_inputs(target, [pdf])
     return {"book": book, "compiled": target, "source": "pypdf_fallback"}
 
 
+def run_pool(fn, pdfs, extra_args, workers, results, errors, failed):
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        futures = {ex.submit(fn, pdf, *extra_args): pdf for pdf in pdfs if pdf not in failed}
+        for fut in as_completed(futures):
+            pdf = futures[fut]
+            try:
+                results.append(fut.result())
+            except Exception as e:
+                failed.add(pdf)
+                errors.append({"pdf": pdf, "error": str(e)})
+
+
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--input-root", required=True)
     ap.add_argument("--output-root", required=True)
     ap.add_argument("--mode", choices=["preprocess", "deepseek", "compile", "all"], default="all")
     ap.add_argument("--dpi", type=int, default=300)
+    ap.add_argument("--model", default="unsloth/DeepSeek-OCR-2")
+    ap.add_argument("--workers", type=int, default=os.cpu_count())
     args = ap.parse_args()
 
     input_root = os.path.abspath(args.input_root)
@@ -78,27 +140,34 @@ def main():
 
     pdfs = find_pdfs(input_root)
     report = {"mode": args.mode, "pdf_count": len(pdfs), "preprocess": [], "deepseek": [], "compile": [], "errors": []}
-
-    for pdf in pdfs:
-        try:
-            if args.mode in ("preprocess", "all"):
-                report["preprocess"].append(preprocess(pdf, output_root, args.dpi))
-
-            if args.mode in ("deepseek", "all"):
+    failed = set()
+
+    # Rendering and compiling are CPU-bound and independent per book, so they fan
+    # out across processes. DeepSeek OCR stays sequential: it shares one GPU.
+    if args.mode in ("preprocess", "all"):
+        run_pool(preprocess, pdfs, (output_root, args.dpi), args.workers, report["preprocess"], report["errors"], failed)
+
+    if args.mode in ("deepseek", "all"):
+        # Load the model once and keep it resident across every book.
+        from ocr_with_deepseek import load_model
+        tokenizer, model = load_model(args.model)
+        for pdf in pdfs:
+            if pdf in failed:
+                continue
+            try:
                 image_dir = os.path.join(output_root, "images", safe_name(pdf))
                 if os.path.isdir(image_dir):
-                    res = deepseek_ocr(image_dir, output_root)
-                    report["deepseek"].append({"pdf": pdf, "code": res.returncode, "stdout": res.stdout[-5000:], "stderr": res.stderr[-5000:]})
-
-            if args.mode in ("compile", "all"):
-                report["compile"].append(compile_texts(pdf, output_root))
+                    report["deepseek"].append({"pdf": pdf, **deepseek_ocr(tokenizer, model, image_dir, output_root)})
+            except Exception as e:
+                failed.add(pdf)
+                report["errors"].append({"pdf": pdf, "error": str(e)})
 
-        except Exception as e:
-            report["errors"].append({"pdf": pdf, "error": str(e)})
+    if args.mode in ("compile", "all"):
+        run_pool(compile_texts, pdfs, (output_root,), args.workers, report["compile"], report["errors"], failed)
 
     out = os.path.join(output_root, "report.json")
-    with open(out, "w", encoding="utf-8") as w:
-        json.dump(report, w, indent=2)
+    with open(out, "wb") as w:
+        w.write(orjson.dumps(report, option=orjson.OPT_INDENT_2))
     print(json.dumps({"ok": len(report["errors"]) == 0, "report": out, "errors": len(report["errors"])}, indent=2))
 
 
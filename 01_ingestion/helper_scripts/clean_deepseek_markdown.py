@@ -5,6 +5,10 @@ from pathlib import Path
 
 TAG_REF_RE = re.compile(r"<\|ref\|>.*?<\|/ref\|>", re.IGNORECASE)
 TAG_DET_RE = re.compile(r"<\|det\|>.*?<\|/det\|>", re.IGNORECASE)
+PAGE_NUM_RE = re.compile(r"\d{1,4}")
+PAGE_LABEL_RE = re.compile(r"page\s+\d{1,4}", re.IGNORECASE)
+DEHYPH_RE = re.compile(r"(\w)-\n(\w)")
+MULTI_NL_RE = re.compile(r"\n{3,}")
 
 COMMON_FIXES = {
     "Shadownrun": "Shadowrun",
@@ -13,6 +17,8 @@ COMMON_FIXES = {
     "THlRD": "THIRD",
     "FASA Corporatlon": "FASA Corporation",
 }
+# Longest-first so overlapping typos prefer the most specific fix.
+COMMON_FIXES_RE = re.compile("|".join(re.escape(k) for k in sorted(COMMON_FIXES, key=len, reverse=True)))
 
 
 def strip_tags(text: str) -> str:
@@ -22,69 +28,54 @@ def strip_tags(text: str) -> str:
 
 
 def apply_common_fixes(text: str) -> str:
-    for bad, good in COMMON_FIXES.items():
-        text = text.replace(bad, good)
-    return text
+    return COMMON_FIXES_RE.sub(lambda m: COMMON_FIXES[m.group(0)], text)
 
 
-def remove_page_number_lines(lines: list[str]) -> list[str]:
-    out = []
-    for line in lines:
-        s = line.strip()
-        if re.fullmatch(r"\d{1,4}", s):
-            continue
-        if re.fullmatch(r"page\s+\d{1,4}", s, flags=re.IGNORECASE):
-            continue
-        out.append(line)
-    return out
+def dehyphenate(text: str) -> str:
+    return DEHYPH_RE.sub(r"\1\2", text)
 
 
-def dedupe_consecutive_lines(lines: list[str]) -> list[str]:
-    out = []
+def _filtered_lines(lines: list[str]):
+    # Drops bare page numbers and consecutive duplicate lines.
     prev = None
     for line in lines:
         s = line.strip()
+        if PAGE_NUM_RE.fullmatch(s) or PAGE_LABEL_RE.fullmatch(s):
+            continue
         if s and prev == s:
             continue
-        out.append(line)
         if s:
             prev = s
-    return out
+        yield line
 
 
-def dehyphenate(text: str) -> str:
-    return re.sub(r"(\w)-\n(\w)", r"\1\2", text)
+def _normalize_heading(line: str) -> str:
+    s = line.strip()
+    if not s:
+        return ""
+    if len(s) < 70 and s.upper() == s and any(ch.isalpha() for ch in s):
+        return f"## {s.title()}"
+    return line
 
 
-def join_wrapped_lines(lines: list[str]) -> list[str]:
+def process_lines(lines: list[str]) -> list[str]:
+    # Single pass: filter/dedupe, join soft-wrapped lines, normalize headings.
     out = []
-    i = 0
-    while i < len(lines):
-        cur = lines[i]
-        if i + 1 < len(lines):
-            nxt = lines[i + 1]
-            c = cur.rstrip()
-            n = nxt.lstrip()
-            if c and n and c[-1] not in ".:;!?" and not c.endswith("  ") and n[:1].islower():
-                out.append(c + " " + n)
-                i += 2
-                continue
-        out.append(cur)
-        i += 1
-    return out
-
-
-def normalize_headings(lines: list[str]) -> list[str]:
-    out = []
-    for line in lines:
-        s = line.strip()
-        if not s:
-            out.append("")
+    pending = None
+    for line in _filtered_lines(lines):
+        if pending is None:
+            pending = line
             continue
-        if len(s) < 70 and s.upper() == s and any(ch.isalpha() for ch in s):
-            out.append(f"## {s.title()}")
+        c = pending.rstrip()
+        n = line.lstrip()
+        if c and n and c[-1] not in ".:;!?" and not c.endswith("  ") and n[:1].islower():
+            out.append(_normalize_heading(c + " " + n))
+            pending = None
         else:
-            out.append(line)
+            out.append(_normalize_heading(pending))
+            pending = line
+    if pending is not None:
+        out.append(_normalize_heading(pending))
     return out
 
 
@@ -92,14 +83,10 @@ def clean_text(text: str) -> str:
     text = strip_tags(text)
     text = apply_common_fixes(text)
     text = dehyphenate(text)
-    lines = text.splitlines()
-    lines = remove_page_number_lines(lines)
-    lines = dedupe_consecutive_lines(lines)
-    lines = join_wrapped_lines(lines)
-    lines = normalize_headings(lines)
+    lines = process_lines(text.splitlines())
 
     cleaned = "\n".join(lines)
-    cleaned = re.sub(r"\n{3,}", "\n\n", cleaned)
+    cleaned = MULTI_NL_RE.sub("\n\n", cleaned)
     return cleaned.strip() + "\n"
 
 
@@ -32,6 +32,25 @@ def run_ocr(tokenizer, model, image_path: str, out_dir: str):
     return res
 
 
+def ocr_images(tokenizer, model, images, out_dir: str):
+    import torch
+    done = 0
+    errors = []
+    # model.infer only accepts one image_file per call, so batching happens at the
+    # loop level: one inference_mode context for the whole run instead of autograd
+    # bookkeeping on every page.
+    with torch.inference_mode():
+        for img in images:
+            stem = os.path.splitext(os.path.basename(img))[0]
+            target = os.path.join(out_dir, stem)
+            try:
+                run_ocr(tokenizer, model, img, target)
+                done += 1
+            except Exception as e:
+                errors.append({"image": img, "error": str(e)})
+    return done, errors
+
+
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--images", required=True, help="Glob for page images")
@@ -44,16 +63,7 @@ def main():
         raise SystemExit("No images found")
 
     tokenizer, model = load_model(args.model)
-    done = 0
-    errors = []
-    for img in images:
-        stem = os.path.splitext(os.path.basename(img))[0]
-        target = os.path.join(args.out, stem)
-        try:
-            run_ocr(tokenizer, model, img, target)
-            done += 1
-        except Exception as e:
-            errors.append({"image": img, "error": str(e)})
+    done, errors = ocr_images(tokenizer, model, images, args.out)
 
     print(json.dumps({"ok": len(errors) == 0, "done": done, "errors": errors[:20]}, indent=2))
 
@@ -1,14 +1,21 @@
 #!/usr/bin/env python3
-import json
+import os
 import subprocess
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import fitz
+import orjson
 
 ROOT = Path('/Volumes/carbonite/GDrive/cindylou/Shadowrun_3e_Rules_Library/organized_3e')
 OUT = ROOT / '_ocr_remote' / 'macos_vision'
 SWIFT = ROOT / 'helper_scripts' / 'vision_ocr_image.swift'
 PDF_DIRS = ['core_rules', 'sourcebooks', 'adventures', 'player_aids']
+JPG_QUALITY = 85
+OCR_WORKERS = os.cpu_count() or 4
+SUMMARY_EVERY = 10
+SUMMARY_INTERVAL_SEC = 30
 
 
 def list_pdfs():
@@ -21,15 +28,11 @@ def list_pdfs():
     return files
 
 
-def render_page(pdf_path: Path, page_idx: int, png_path: Path, dpi=220):
-    doc = fitz.open(pdf_path)
+def render_page(doc, page_idx: int, img_path: Path, dpi=220):
     page = doc[page_idx]
-    scale = dpi / 72.0
-    mat = fitz.Matrix(scale, scale)
-    pix = page.get_pixmap(matrix=mat, alpha=False)
-    png_path.parent.mkdir(parents=True, exist_ok=True)
-    pix.save(str(png_path))
-    doc.close()
+    pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY, alpha=False)
+    img_path.parent.mkdir(parents=True, exist_ok=True)
+    pix.save(str(img_path), jpg_quality=JPG_QUALITY)
 
 
 def ocr_image(img_path: Path):
@@ -44,7 +47,8 @@ def process_pdf(pdf: Path):
     stem = str(rel).replace('/', '__').replace('.pdf', '')
     out_dir = OUT / stem
     images = out_dir / 'images'
-    out_dir.mkdir(parents=True, exist_ok=True)
+    pages_dir = out_dir / 'pages'
+    pages_dir.mkdir(parents=True, exist_ok=True)
     out_txt = out_dir / 'result.txt'
     meta = out_dir / 'meta.json'
 
@@ -53,22 +57,42 @@ def process_pdf(pdf: Path):
 
     doc = fitz.open(pdf)
     total = len(doc)
-    doc.close()
-    chunks = []
-    failed = []
     t0 = time.time()
+    render_lock = threading.Lock()
 
-    for i in range(total):
+    def do_page(i):
+        # Returns (chunk, failure). Vision is single-threaded per swift process,
+        # so pages OCR concurrently; rendering on the shared doc stays serialized.
         page_no = i + 1
-        png = images / f'page_{page_no:04d}.png'
+        img = images / f'page_{page_no:04d}.jpg'
+        page_txt = pages_dir / f'page_{page_no:04d}.txt'
+
+        # Resume: reuse per-page OCR that is not older than its rendered image.
+        if page_txt.exists() and page_txt.stat().st_size > 10:
+            if not img.exists() or page_txt.stat().st_mtime >= img.stat().st_mtime:
+                txt = page_txt.read_text(encoding='utf-8')
+                return f"\n\n===== PAGE {page_no} =====\n{txt}", None
+
         try:
-            if not png.exists():
-                render_page(pdf, i, png)
-            txt = ocr_image(png)
-            chunks.append(f"\n\n===== PAGE {page_no} =====\n{txt}")
+            if not img.exists():
+                with render_lock:
+                    render_page(doc, i, img)
+            txt = ocr_image(img)
+            page_txt.write_text(txt, encoding='utf-8')
+            return f"\n\n===== PAGE {page_no} =====\n{txt}", None
         except Exception as e:
-            failed.append({'page': page_no, 'error': str(e)})
-            chunks.append(f"\n\n===== PAGE {page_no} =====\n[OCR_ERROR] {e}")
+            return f"\n\n===== PAGE {page_no} =====\n[OCR_ERROR] {e}", {'page': page_no, 'error': str(e)}
+
+    chunks = []
+    failed = []
+    try:
+        with ThreadPoolExecutor(max_workers=OCR_WORKERS) as ex:
+            for chunk, fail in ex.map(do_page, range(total)):
+                chunks.append(chunk)
+                if fail:
+                    failed.append(fail)
+    finally:
+        doc.close()
 
     merged = ''.join(chunks)
     out_txt.write_text(merged, encoding='utf-8')
@@ -81,14 +105,19 @@ def process_pdf(pdf: Path):
     }
     if failed:
         m['errors'] = failed[:50]
-    meta.write_text(json.dumps(m, indent=2), encoding='utf-8')
+    meta.write_bytes(orjson.dumps(m, option=orjson.OPT_INDENT_2))
     return m
 
 
+def write_summary(summary):
+    (OUT / 'summary.json').write_bytes(orjson.dumps(summary, option=orjson.OPT_INDENT_2))
+
+
 def main():
     OUT.mkdir(parents=True, exist_ok=True)
     pdfs = list_pdfs()
     summary = {'total': len(pdfs), 'ok': 0, 'partial': 0, 'skipped_existing': 0, 'error': 0, 'items': []}
+    last_write = time.time()
     for i,p in enumerate(pdfs,1):
         print(f'[{i}/{len(pdfs)}] {p.name}', flush=True)
         try:
@@ -97,7 +126,11 @@ def main():
             r = {'pdf': str(p.relative_to(ROOT)), 'status': 'error', 'error': str(e)}
         summary['items'].append(r)
         summary[r['status']] = summary.get(r['status'],0)+1
-        (OUT/'summary.json').write_text(json.dumps(summary, indent=2), encoding='utf-8')
+        # Summary grows with every PDF; rewrite it periodically, not per item.
+        if i % SUMMARY_EVERY == 0 or time.time() - last_write >= SUMMARY_INTERVAL_SEC:
+            write_summary(summary)
+            last_write = time.time()
+    write_summary(summary)
 
 
 if __name__ == '__main__':
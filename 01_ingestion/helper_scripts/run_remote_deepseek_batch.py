@@ -1,10 +1,14 @@
 #!/usr/bin/env python3
 import json
-import subprocess
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import fitz
+import orjson
+import requests
+from requests.adapters import HTTPAdapter
 from clean_deepseek_markdown import clean_text
 
 ROOT = Path('/Volumes/carbonite/GDrive/cindylou/Shadowrun_3e_Rules_Library/organized_3e')
@@ -15,6 +19,14 @@ PDF_DIRS = ['core_rules', 'sourcebooks', 'adventures', 'player_aids']
 DPI = 180
 PER_PAGE_TIMEOUT_SEC = 180
 RETRIES = 3
+OCR_WORKERS = 4
+SUMMARY_EVERY = 10
+SUMMARY_INTERVAL_SEC = 30
+JPG_QUALITY = 85
+
+# One pooled keep-alive session shared by all OCR workers.
+SESSION = requests.Session()
+SESSION.mount('http://', HTTPAdapter(pool_connections=OCR_WORKERS, pool_maxsize=OCR_WORKERS))
 
 
 def list_pdfs():
@@ -29,32 +41,33 @@ def list_pdfs():
     return files
 
 
-def render_page(doc, page_idx: int, png_path: Path, dpi=DPI):
+def render_page(doc, page_idx: int, img_path: Path, dpi=DPI):
     page = doc[page_idx]
-    scale = dpi / 72.0
-    mat = fitz.Matrix(scale, scale)
-    pix = page.get_pixmap(matrix=mat, alpha=False)
-    png_path.parent.mkdir(parents=True, exist_ok=True)
-    pix.save(str(png_path))
-
-
-def ocr_png(png_path: Path):
-    cmd = [
-        'curl', '-sS', '-f', '--max-time', str(PER_PAGE_TIMEOUT_SEC), ENDPOINT,
-        '-F', f'file=@{png_path}',
-        '--form-string', f'prompt={PROMPT}',
-    ]
-    cp = subprocess.run(cmd, capture_output=True, text=True)
-    if cp.returncode != 0:
-        return None, (cp.stderr.strip() or f'returncode={cp.returncode}')
-    body = cp.stdout.strip()
+    pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY, alpha=False)
+    img_path.parent.mkdir(parents=True, exist_ok=True)
+    pix.save(str(img_path), jpg_quality=JPG_QUALITY)
+
+
+def ocr_png(img_path: Path):
+    try:
+        with img_path.open('rb') as fh:
+            r = SESSION.post(
+                ENDPOINT,
+                files={'file': (img_path.name, fh)},
+                data={'prompt': PROMPT},
+                timeout=PER_PAGE_TIMEOUT_SEC,
+            )
+        r.raise_for_status()
+    except requests.RequestException as e:
+        return None, str(e)
+    body = r.text.strip()
     if not body:
         return None, 'empty response body'
     try:
-        parsed = json.loads(body)
+        parsed = orjson.loads(body)
         result_text = parsed.get('result', '')
         if not isinstance(result_text, str):
-            result_text = json.dumps(result_text, ensure_ascii=False, indent=2)
+            result_text = orjson.dumps(result_text, option=orjson.OPT_INDENT_2).decode('utf-8')
         return result_text, None
     except Exception as e:
         return None, f'json parse error: {e}'
@@ -78,24 +91,27 @@ def process_pdf(pdf: Path):
     failed = []
     chars = 0
     t0 = time.time()
+    doc_lock = threading.Lock()
 
-    for i in range(total_pages):
+    def do_page(i):
+        # Returns (chars, failure); rendering is serialized on the shared doc,
+        # OCR requests overlap across workers.
         page_no = i + 1
-        png = images / f'page_{page_no:04d}.png'
+        img = images / f'page_{page_no:04d}.jpg'
         page_md = pages_dir / f'page_{page_no:04d}.md'
 
         if page_md.exists() and page_md.stat().st_size > 10:
-            chars += page_md.stat().st_size
-            continue
+            return page_md.stat().st_size, None
 
         try:
-            if not png.exists():
-                render_page(doc, i, png)
+            if not img.exists():
+                with doc_lock:
+                    render_page(doc, i, img)
 
             last_err = None
             text = None
             for attempt in range(1, RETRIES + 1):
-                text, err = ocr_png(png)
+                text, err = ocr_png(img)
                 if text is not None:
                     break
                 last_err = err
@@ -105,11 +121,17 @@ def process_pdf(pdf: Path):
                 raise RuntimeError(last_err or 'unknown OCR error')
 
             page_md.write_text(text, encoding='utf-8')
-            chars += len(text)
+            return len(text), None
 
         except Exception as e:
-            failed.append({'page': page_no, 'error': str(e)})
             page_md.write_text(f'[OCR_ERROR] {e}\n', encoding='utf-8')
+            return 0, {'page': page_no, 'error': str(e)}
+
+    with ThreadPoolExecutor(max_workers=OCR_WORKERS) as ex:
+        for n, fail in ex.map(do_page, range(total_pages)):
+            chars += n
+            if fail:
+                failed.append(fail)
 
     doc.close()
 
@@ -137,17 +159,21 @@ def process_pdf(pdf: Path):
     }
     if failed:
         meta['errors'] = failed[:200]
-    meta_json.write_text(json.dumps(meta, indent=2), encoding='utf-8')
+    meta_json.write_bytes(orjson.dumps(meta, option=orjson.OPT_INDENT_2))
     return meta
 
 
+def write_summary(summary):
+    (OUT / 'summary.json').write_bytes(orjson.dumps(summary, option=orjson.OPT_INDENT_2))
+
+
 def main():
     OUT.mkdir(parents=True, exist_ok=True)
     pdfs = list_pdfs()
     summary = {
         'started_at': time.strftime('%Y-%m-%d %H:%M:%S'),
         'endpoint': ENDPOINT,
-        'mode': 'png_per_page',
+        'mode': 'jpg_per_page',
         'total': len(pdfs),
         'ok': 0,
         'partial': 0,
@@ -156,6 +182,7 @@ def main():
         'items': []
     }
 
+    last_write = time.time()
     for i, pdf in enumerate(pdfs, start=1):
         print(f'[{i}/{len(pdfs)}] {pdf.name}', flush=True)
         rel = str(pdf.relative_to(ROOT))
@@ -170,10 +197,13 @@ def main():
                 r = {'pdf': rel, 'status': 'error', 'error': str(e)}
         summary['items'].append(r)
         summary[r['status']] = summary.get(r['status'], 0) + 1
-        (OUT / 'summary.json').write_text(json.dumps(summary, indent=2), encoding='utf-8')
+        # Summary grows with every PDF; rewrite it periodically, not per item.
+        if i % SUMMARY_EVERY == 0 or time.time() - last_write >= SUMMARY_INTERVAL_SEC:
+            write_summary(summary)
+            last_write = time.time()
 
     summary['finished_at'] = time.strftime('%Y-%m-%d %H:%M:%S')
-    (OUT / 'summary.json').write_text(json.dumps(summary, indent=2), encoding='utf-8')
+    write_summary(summary)
     print(json.dumps({k: summary[k] for k in ['total', 'ok', 'partial', 'skipped_existing', 'error']}, indent=2))
 
 
@@ -4,6 +4,8 @@ import sys
 import re
 import os
 
+PAGE_MARKER_RE = re.compile(r'===== PAGE (\d+) =====')
+
 def split_ocr(input_file, output_dir, chunks):
     """
     chunks: list of (start_page, end_page, filename_hint)
@@ -13,28 +15,23 @@ def split_ocr(input_file, output_dir, chunks):
     with open(input_file, 'r', encoding='utf-8') as f:
         content = f.read()
 
-    # Split on page markers
-    parts = re.split(r'(===== PAGE \d+ =====)', content)
-
-    # Reconstruct page dict
-    pages = {}
-    current_page = 0
-    for i, part in enumerate(parts):
-        m = re.match(r'===== PAGE (\d+) =====', part)
-        if m:
-            current_page = int(m.group(1))
-            pages[current_page] = part
-        elif current_page > 0:
-            pages[current_page] = pages.get(current_page, '') + part
+    # Single finditer sweep: record each page's (start, end) span in content.
+    # A repeated page number keeps its last occurrence.
+    marks = [(int(m.group(1)), m.start()) for m in PAGE_MARKER_RE.finditer(content)]
+    page_span = {}
+    for i, (page_no, start) in enumerate(marks):
+        end = marks[i + 1][1] if i + 1 < len(marks) else len(content)
+        page_span[page_no] = (start, end)
 
     os.makedirs(output_dir, exist_ok=True)
 
     written = []
     for (start_page, end_page, hint) in chunks:
-        chunk_text = ''
-        for p in range(start_page, end_page + 1):
-            if p in pages:
-                chunk_text += pages[p]
+        chunk_text = ''.join(
+            content[page_span[p][0]:page_span[p][1]]
+            for p in range(start_page, end_page + 1)
+            if p in page_span
+        )
 
         out_name = f"chunk_{start_page:03d}-{end_page:03d}_{hint}.txt"
         out_path = os.path.join(output_dir, out_name)
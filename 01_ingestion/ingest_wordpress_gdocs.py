@@ -1,9 +1,14 @@
 #!/usr/bin/env python3
+import gzip
+import http.client
 import json
 import re
 import sys
-import urllib.request
+import threading
+import urllib.error
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from urllib.parse import urljoin, urlsplit
 
 REPO_ROOT = Path(__file__).resolve().parents[1]
 if str(REPO_ROOT) not in sys.path:
@@ -15,43 +20,101 @@ P = get_paths()
 SRC = P.raw_root / 'Game_Logs' / 'Historical Wordpress Posts'
 OUT = P.memory_root / 'wordpress_ingest'
 OUT.mkdir(parents=True, exist_ok=True)
+EXPORT_WORKERS = 16
+
+EXPORT_TIMEOUT_SEC = 20
+EXPORT_MAX_REDIRECTS = 5
+
+# Keep-alive connections, one per host per export worker thread, so a worker
+# pays one TLS handshake per host instead of one per document.
+_CONNS = threading.local()
 
 
 def slugify(name: str) -> str:
     return re.sub(r'[^a-z0-9-]+', '-', name.lower()).strip('-')
 
 
+def _fetch(url: str):
+    # One GET on this thread's connection to the host. A reused connection
+    # the server has meanwhile closed is reopened and the request retried once.
+    parts = urlsplit(url)
+    conns = _CONNS.__dict__.setdefault('by_host', {})
+    key = (parts.scheme, parts.netloc)
+    target = parts.path + ('?' + parts.query if parts.query else '')
+    for attempt in (0, 1):
+        conn = conns.get(key)
+        reused = conn is not None
+        if conn is None:
+            cls = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+            conn = conns[key] = cls(parts.netloc, timeout=EXPORT_TIMEOUT_SEC)
+        try:
+            conn.request('GET', target, headers={'Accept-Encoding': 'gzip'})
+            resp = conn.getresponse()
+            return resp, resp.read()
+        except (http.client.HTTPException, OSError):
+            conn.close()
+            del conns[key]
+            if not reused or attempt:
+                raise
+
+
 def export_doc(doc_id: str) -> str:
     url = f'https://docs.google.com/document/d/{doc_id}/export?format=txt'
-    with urllib.request.urlopen(url, timeout=20) as r:
-        return r.read().decode('utf-8', errors='replace')
+    for _ in range(EXPORT_MAX_REDIRECTS + 1):
+        resp, body = _fetch(url)
+        if resp.status in (301, 302, 303, 307, 308) and resp.getheader('Location'):
+            url = urljoin(url, resp.getheader('Location'))
+            continue
+        if resp.status >= 400:
+            raise urllib.error.HTTPError(url, resp.status, resp.reason, resp.headers, None)
+        if resp.getheader('Content-Encoding') == 'gzip':
+            body = gzip.decompress(body)
+        return body.decode('utf-8', errors='replace')
+    raise urllib.error.URLError(f'too many redirects: {url}')
+
+
+def load_doc_id(g: Path):
+    try:
+        meta = json.loads(g.read_text(encoding='utf-8', errors='replace'))
+    except Exception:
+        return None
+    return meta.get('doc_id') or None
+
+
+def import_doc(job) -> bool:
+    g, out_dir = job
+    doc_id = load_doc_id(g)
+    if not doc_id:
+        return False
+    try:
+        text = export_doc(doc_id)
+    except Exception:
+        return False
+    if not text.strip():
+        return False
+    out = out_dir / (slugify(g.stem) + '.md')
+    out.write_text(
+        f"# Imported: {g.stem}\n\n"
+        f"- Source gdoc: `{g}`\n"
+        f"- Doc ID: `{doc_id}`\n\n"
+        + text.strip() + '\n',
+        encoding='utf-8',
+    )
+    return True
 
 
 def main():
-    count = 0
+    jobs = []
     for folder in sorted([p for p in SRC.iterdir() if p.is_dir()]):
         out_dir = OUT / folder.name
         out_dir.mkdir(parents=True, exist_ok=True)
         for g in sorted(folder.glob('*.gdoc')):
-            try:
-                meta = json.loads(g.read_text(encoding='utf-8', errors='replace'))
-                doc_id = meta.get('doc_id')
-                if not doc_id:
-                    continue
-                text = export_doc(doc_id)
-                if not text.strip():
-                    continue
-                out = out_dir / (slugify(g.stem) + '.md')
-                out.write_text(
-                    f"# Imported: {g.stem}\n\n"
-                    f"- Source gdoc: `{g}`\n"
-                    f"- Doc ID: `{doc_id}`\n\n"
-                    + text.strip() + '\n',
-                    encoding='utf-8',
-                )
-                count += 1
-            except Exception:
-                continue
+            jobs.append((g, out_dir))
+
+    # Exports are network-bound, so fetch them concurrently. The .gdoc stubs
+    # live on the synced Drive as well and are read by the same workers.
+    with ThreadPoolExecutor(max_workers=EXPORT_WORKERS) as ex:
+        count = sum(ex.map(import_doc, jobs))
     print('imported', count)
 
 
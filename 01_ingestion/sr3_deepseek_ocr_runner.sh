@@ -69,7 +69,7 @@ while true; do
   echo "$now exit_code=$code log=$run_log" > "$HEARTBEAT_FILE"
 
   if [[ $code -eq 0 ]]; then
-    if rg -qi "timed out|curl: \(28\)|connection refused|empty response body" "$run_log"; then
+    if rg -qi "timed out|connection refused|max retries exceeded|empty response body" "$run_log"; then
       echo "[$now] warning: timeout/server errors seen in $run_log" | tee -a "$ALERT_FILE"
     fi
     echo "[$now] batch completed; sleeping 10m before next pass" | tee -a "$run_log"
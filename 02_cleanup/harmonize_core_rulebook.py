@@ -10,16 +10,23 @@ Notes:
 - Input format is expected to use markers like: ===== PAGE 123 =====
 - If DeepSeek `result.cleaned.md` is missing, the script can synthesize page-marker text
   from sibling `pages/page_XXXX.md` files for a best-effort first pass.
-- Uses Python standard library only.
+- Uses Python standard library only; orjson speeds up JSON output and
+  python-Levenshtein near-duplicate line checks when installed
+  (`pip install -r 02_cleanup/requirements.txt`).
 """
 
 from __future__ import annotations
 
 import argparse
 import json
+import math
+import os
 import re
 import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
 from typing import Dict, Iterable, List, Tuple
 
@@ -29,10 +36,45 @@ if str(REPO_ROOT) not in sys.path:
 
 from config.pipeline_paths import get_paths
 
+try:
+    import orjson
+except ImportError:  # optional speedup; stdlib json is the fallback
+    orjson = None
+
+try:
+    import Levenshtein
+except ImportError:  # optional speedup; a bounded pure-Python DP is the fallback
+    Levenshtein = None
+
+
+def json_dump_bytes(obj) -> bytes:
+    # Same layout as json.dumps(indent=2, ensure_ascii=False).
+    if orjson:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, indent=2, ensure_ascii=False).encode("utf-8")
+
+
+def json_line_bytes(obj) -> bytes:
+    # One JSONL row, UTF-8, non-ASCII kept as is.
+    if orjson:
+        return orjson.dumps(obj, option=orjson.OPT_APPEND_NEWLINE)
+    return (json.dumps(obj, ensure_ascii=False) + "\n").encode("utf-8")
+
+
 P = get_paths()
 
-PAGE_RE = re.compile(r"^=====\s*PAGE\s+(\d+)\s*=====\s*$", re.MULTILINE)
+# Bytes \s misses \x1c-\x1f, which str \s matches; non-ASCII spaces and
+# digits are handled by marker_view().
+PAGE_RE = re.compile(rb"^=====[\s\x1c-\x1f]*PAGE[\s\x1c-\x1f]+(\d+)[\s\x1c-\x1f]*=====[\s\x1c-\x1f]*$", re.MULTILINE)
 TOKEN_RE = re.compile(r"[a-z0-9]+")
+# ASCII byte -> 0 whitespace, 1 alphanumeric, 2 symbol (str semantics).
+CHAR_CLASS_TABLE = bytes(0 if chr(i).isspace() else 1 if chr(i).isalnum() else 2 for i in range(256))
+# Two lines of a page count as duplicates when their edit distance is below
+# this fraction of the shorter one (OCR running headers, page-number drift).
+NEAR_DUP_EDIT_RATIO = 0.1
+# Books with at least this many pages are harmonized across worker processes.
+PARALLEL_MIN_PAGES = 64
+WORKERS = os.cpu_count() or 1
 
 DEFAULT_BASE = Path(
     P.raw_root / "Shadowrun_3e_Rules_Library/organized_3e/_ocr_remote"
@@ -64,18 +106,59 @@ class PageMetrics:
     suspicious: bool
 
 
-def load_text(path: Path) -> str:
-    return path.read_text(encoding="utf-8", errors="replace")
+def load_text(path: Path) -> bytes:
+    """Raw UTF-8 OCR output with newlines normalized as text mode would.
+
+    The whole file stays bytes; parse_pages decodes it one page at a time, so
+    a single non-Latin-1 character cannot widen the entire book in memory.
+    """
+    return path.read_bytes().replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+
+
+@lru_cache(maxsize=None)
+def _unicode_space_digit_re() -> re.Pattern:
+    # UTF-8 of every non-ASCII character str \s or \d matches, one
+    # alternative per shared prefix. Built on first non-ASCII input only.
+    last_bytes: Dict[bytes, set] = {}
+    for cp in range(0x80, sys.maxunicode + 1):
+        ch = chr(cp)
+        if not 0xD800 <= cp < 0xE000 and (ch.isspace() or ch.isdecimal()):
+            seq = ch.encode("utf-8")
+            last_bytes.setdefault(seq[:-1], set()).add(seq[-1])
+    return re.compile(b"|".join(
+        re.escape(prefix) + b"[" + b"".join(re.escape(bytes([b])) for b in sorted(ends)) + b"]"
+        for prefix, ends in sorted(last_bytes.items())
+    ))
+
+
+@lru_cache(maxsize=None)
+def _ascii_stand_in(seq: bytes) -> bytes:
+    return (b" " if seq.decode("utf-8").isspace() else b"0") * len(seq)
+
+
+def marker_view(marker_text: bytes) -> bytes:
+    """Copy of the text for PAGE_RE, with the same byte offsets.
 
+    On decoded text the marker pattern's space and digit classes also take
+    NBSP, other Unicode spaces and non-ASCII digits. Each such character
+    becomes as many ASCII spaces or zeros as it has bytes, so those markers
+    still match; page text and numbers are then read from the original bytes.
+    """
+    if marker_text.isascii():
+        return marker_text
+    return _unicode_space_digit_re().sub(lambda m: _ascii_stand_in(m.group()), marker_text)
 
-def parse_pages(marker_text: str) -> Dict[int, str]:
-    matches = list(PAGE_RE.finditer(marker_text))
+
+def parse_pages(marker_text: bytes) -> Dict[int, str]:
+    # Matches are streamed; a page is cut out once the next marker is seen.
     pages: Dict[int, str] = {}
-    for idx, match in enumerate(matches):
-        page_no = int(match.group(1))
-        start = match.end()
-        end = matches[idx + 1].start() if idx + 1 < len(matches) else len(marker_text)
-        pages[page_no] = marker_text[start:end].strip("\n")
+    prev: Tuple[int, int] | None = None
+    for match in PAGE_RE.finditer(marker_view(marker_text)):
+        if prev is not None:
+            pages[prev[0]] = marker_text[prev[1]:match.start()].decode("utf-8", errors="replace").strip("\n")
+        prev = (int(marker_text[match.start(1):match.end(1)].decode("utf-8")), match.end())
+    if prev is not None:
+        pages[prev[0]] = marker_text[prev[1]:].decode("utf-8", errors="replace").strip("\n")
     return pages
 
 
@@ -86,18 +169,23 @@ def synthesize_markered_text_from_deepseek_pages(deepseek_dir: Path) -> str:
             f"DeepSeek cleaned file missing and pages dir not found: {pages_dir}"
         )
 
-    page_files = sorted(pages_dir.glob("page_*.md"))
+    # One scandir pass instead of glob + a Path object per page file.
+    with os.scandir(pages_dir) as it:
+        page_files = sorted(
+            (e.name, e.path) for e in it if e.name.startswith("page_") and e.name.endswith(".md")
+        )
     if not page_files:
         raise FileNotFoundError(f"No page files found in {pages_dir}")
 
     chunks: List[str] = []
-    for pf in page_files:
-        stem = pf.stem  # page_0001
+    for name, path in page_files:
+        stem = name[:-3]  # page_0001
         try:
             page_no = int(stem.split("_")[-1])
         except ValueError:
             continue
-        text = pf.read_text(encoding="utf-8", errors="replace").strip("\n")
+        with open(path, encoding="utf-8", errors="replace") as fh:
+            text = fh.read().strip("\n")
         chunks.append(f"===== PAGE {page_no} =====\n{text}\n")
     if not chunks:
         raise ValueError(f"No parseable DeepSeek page files in {pages_dir}")
@@ -105,27 +193,112 @@ def synthesize_markered_text_from_deepseek_pages(deepseek_dir: Path) -> str:
 
 
 def line_signature(line: str) -> str:
-    return re.sub(r"\s+", " ", line.strip().lower())
-
-
-def compute_metrics(text: str) -> PageMetrics:
+    # str.split() treats the same characters as whitespace as \s, so this
+    # matches collapsing \s+ runs and stripping, without the regex engine.
+    return " ".join(line.lower().split())
+
+
+def page_tokens(text: str) -> List[str]:
+    return TOKEN_RE.findall(text.lower())
+
+
+def within_edit_distance(a: str, b: str, k: int) -> bool:
+    """True when the Levenshtein distance between a and b is at most k."""
+    if Levenshtein is not None:
+        return Levenshtein.distance(a, b, score_cutoff=k) <= k
+    la, lb = len(a), len(b)
+    if abs(la - lb) > k:
+        return False
+    # Only cells within k of the diagonal can stay at or below k.
+    over = k + 1
+    prev = [j if j <= k else over for j in range(lb + 1)]
+    for i in range(1, la + 1):
+        cur = [over] * (lb + 1)
+        if i <= k:
+            cur[0] = i
+        ca = a[i - 1]
+        for j in range(max(1, i - k), min(lb, i + k) + 1):
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != b[j - 1]), over)
+        if min(cur) > k:
+            return False
+        prev = cur
+    return prev[lb] <= k
+
+
+def duplicate_line_count(lines: List[str]) -> int:
+    """Lines that repeat another line of the page exactly or nearly.
+
+    Near-identical lines are grouped transitively; every line beyond the
+    first of its group is a duplicate. Pairs are screened cheapest first with
+    lower bounds on the edit distance, so no pair within it is skipped: the
+    length difference, then the characters of the longer line missing from
+    the shorter one, counted with multiplicity (each edit supplies at most
+    one), and only then the edit distance itself.
+    """
+    unique = sorted(set(lines), key=len)
+    # A line's characters as (char, occurrence number) pairs: a plain set
+    # difference of two of these is the multiset difference, computed in C.
+    chars = [{(c, n) for c, m in Counter(ln).items() for n in range(m)} for ln in unique]
+    group = list(range(len(unique)))
+
+    def root(i: int) -> int:
+        while group[i] != i:
+            group[i] = group[group[i]]
+            i = group[i]
+        return i
+
+    merged = 0
+    for i, a in enumerate(unique):
+        # Largest distance strictly below NEAR_DUP_EDIT_RATIO * len(shorter).
+        k = math.ceil(NEAR_DUP_EDIT_RATIO * len(a)) - 1
+        if k < 1:
+            continue
+        for j in range(i + 1, len(unique)):
+            b = unique[j]
+            if len(b) - len(a) > k:
+                break
+            if len(chars[j] - chars[i]) > k:
+                continue
+            ri, rj = root(i), root(j)
+            if ri != rj and within_edit_distance(a, b, k):
+                group[rj] = ri
+                merged += 1
+    return len(lines) - len(unique) + merged
+
+
+def compute_metrics(text: str, lowered: str | None = None, words: List[str] | None = None) -> PageMetrics:
+    # `lowered` is text.lower() and `words` page_tokens(text) when the caller
+    # already has them; the page is lowercased once for both.
     stripped = text.strip()
     char_count = len(stripped)
-    words = TOKEN_RE.findall(stripped.lower())
+    if lowered is None:
+        lowered = text.lower()
+    if words is None:
+        words = TOKEN_RE.findall(lowered)
     word_count = len(words)
-    lines = [ln for ln in (line_signature(ln) for ln in stripped.splitlines()) if ln]
+    # line_signature() of every line, taken from the already-lowered page.
+    lines = [sig for sig in (" ".join(ln.split()) for ln in lowered.splitlines()) if sig]
     line_count = len(lines)
 
     empty = word_count == 0
     short = word_count < 25
 
-    non_space_chars = [c for c in stripped if not c.isspace()]
-    symbol_chars = [c for c in non_space_chars if not c.isalnum()]
-    symbol_noise_ratio = (len(symbol_chars) / len(non_space_chars)) if non_space_chars else 1.0
+    if stripped.isascii():
+        # Typical OCR page: classify every byte with one translate() and
+        # count the classes, all in C.
+        classes = stripped.encode("ascii").translate(CHAR_CLASS_TABLE)
+        non_space_count = len(classes) - classes.count(0)
+        symbol_count = classes.count(2)
+    else:
+        # str.split() drops exactly the isspace() characters.
+        non_space = "".join(stripped.split())
+        non_space_count = len(non_space)
+        symbol_count = non_space_count - sum(map(str.isalnum, non_space))
+    symbol_noise_ratio = (symbol_count / non_space_count) if non_space_count else 1.0
 
     duplicate_line_ratio = 0.0
     if line_count > 1:
-        dup_count = line_count - len(set(lines))
+        dup_count = duplicate_line_count(lines)
         duplicate_line_ratio = dup_count / line_count
 
     score = 100.0
@@ -155,17 +328,20 @@ def compute_metrics(text: str) -> PageMetrics:
 
 
 def token_set(text: str) -> set[str]:
-    return set(TOKEN_RE.findall(text.lower()))
+    return set(page_tokens(text))
 
 
-def jaccard_overlap(a: str, b: str) -> float:
-    ta = token_set(a)
-    tb = token_set(b)
+def jaccard_overlap(ta: set[str], tb: set[str]) -> float:
     if not ta and not tb:
         return 1.0
     if not ta or not tb:
         return 0.0
-    return len(ta & tb) / len(ta | tb)
+    # |A ∪ B| = |A| + |B| - |A ∩ B|: only the intersection is built, and
+    # set & iterates the smaller operand. min/max of the set sizes bounds the
+    # result from above, but it is no shortcut: the exact value is reported
+    # for every page, not just compared against the disagreement threshold.
+    inter = len(ta & tb)
+    return inter / (len(ta) + len(tb) - inter)
 
 
 def choose_winner(mac_metrics: PageMetrics, deep_metrics: PageMetrics) -> Tuple[str, List[str]]:
@@ -217,70 +393,88 @@ def page_record(page_no: int, text: str, metrics: PageMetrics) -> Dict[str, obje
     }
 
 
-def harmonize(mac_pages: Dict[int, str], deep_pages: Dict[int, str]) -> Dict[str, object]:
-    all_pages = sorted(set(mac_pages) | set(deep_pages))
+def process_page(args: Tuple[int, str, str]) -> Tuple[str, Dict[str, object], Dict[str, object] | None]:
+    """Harmonize one page: (harmonized chunk, meta record, review item or None)."""
+    p, mac_text, deep_text = args
 
-    harmonized_chunks: List[str] = []
-    meta_pages: List[Dict[str, object]] = []
-    review_queue: List[Dict[str, object]] = []
+    # Each page is lowercased and tokenized once for its metrics and the overlap.
+    mac_low = mac_text.lower()
+    deep_low = deep_text.lower()
+    mac_words = TOKEN_RE.findall(mac_low)
+    deep_words = TOKEN_RE.findall(deep_low)
+    mac_m = compute_metrics(mac_text, mac_low, mac_words)
+    deep_m = compute_metrics(deep_text, deep_low, deep_words)
 
-    for p in all_pages:
-        mac_text = mac_pages.get(p, "")
-        deep_text = deep_pages.get(p, "")
+    overlap = jaccard_overlap(set(mac_words), set(deep_words))
+    winner, winner_reasons = choose_winner(mac_m, deep_m)
 
-        mac_m = compute_metrics(mac_text)
-        deep_m = compute_metrics(deep_text)
+    chosen_text = mac_text if winner == "macos" else deep_text
+    chosen_m = mac_m if winner == "macos" else deep_m
 
-        overlap = jaccard_overlap(mac_text, deep_text)
-        winner, winner_reasons = choose_winner(mac_m, deep_m)
+    flags: List[str] = []
 
-        chosen_text = mac_text if winner == "macos" else deep_text
-        chosen_m = mac_m if winner == "macos" else deep_m
+    # a) high disagreement
+    if overlap < 0.22 and mac_m.word_count >= 20 and deep_m.word_count >= 20:
+        flags.append("high_disagreement_low_overlap")
 
-        flags: List[str] = []
+    # b) both low quality
+    if mac_m.low_quality and deep_m.low_quality:
+        flags.append("both_low_quality")
 
-        # a) high disagreement
-        if overlap < 0.22 and mac_m.word_count >= 20 and deep_m.word_count >= 20:
-            flags.append("high_disagreement_low_overlap")
+    # c) chosen still suspicious
+    if chosen_m.suspicious:
+        flags.append("chosen_suspicious")
 
-        # b) both low quality
-        if mac_m.low_quality and deep_m.low_quality:
-            flags.append("both_low_quality")
+    chunk = f"===== PAGE {p} =====\n{chosen_text.strip()}\n"
 
-        # c) chosen still suspicious
-        if chosen_m.suspicious:
-            flags.append("chosen_suspicious")
+    meta_page = {
+        "page": p,
+        "winner": winner,
+        "winner_reasons": winner_reasons,
+        "overlap_jaccard": round(overlap, 4),
+        "flags": flags,
+        "sources": {
+            "macos": page_record(p, mac_text, mac_m),
+            "deepseek": page_record(p, deep_text, deep_m),
+        },
+    }
 
-        harmonized_chunks.append(f"===== PAGE {p} =====\n{chosen_text.strip()}\n")
+    review_item = None
+    if flags:
+        review_item = {
+            "page": p,
+            "winner": winner,
+            "flags": flags,
+            "overlap_jaccard": round(overlap, 4),
+            "mac_excerpt": short_excerpt(mac_text),
+            "deepseek_excerpt": short_excerpt(deep_text),
+        }
 
-        meta_pages.append(
-            {
-                "page": p,
-                "winner": winner,
-                "winner_reasons": winner_reasons,
-                "overlap_jaccard": round(overlap, 4),
-                "flags": flags,
-                "sources": {
-                    "macos": page_record(p, mac_text, mac_m),
-                    "deepseek": page_record(p, deep_text, deep_m),
-                },
-            }
-        )
+    return chunk, meta_page, review_item
+
+
+def harmonize(mac_pages: Dict[int, str], deep_pages: Dict[int, str]) -> Dict[str, object]:
+    # Key views union straight into one set. Marker order is not guaranteed
+    # to ascend (out-of-order OCR pages), so the sort stays; small ints
+    # iterate from a set nearly in order, which Timsort handles in ~O(n).
+    all_pages = sorted(mac_pages.keys() | deep_pages.keys())
+    jobs = [(p, mac_pages.get(p, ""), deep_pages.get(p, "")) for p in all_pages]
+
+    if len(jobs) >= PARALLEL_MIN_PAGES and WORKERS > 1:
+        # Pages are independent; map() keeps them in page order. The default
+        # start method (spawn on macOS) re-imports this module in workers,
+        # whether it was run directly or through the scripts/ runpy shim.
+        with ProcessPoolExecutor(max_workers=WORKERS) as ex:
+            results = list(ex.map(process_page, jobs, chunksize=16))
+    else:
+        results = [process_page(job) for job in jobs]
 
-        if flags:
-            review_queue.append(
-                {
-                    "page": p,
-                    "winner": winner,
-                    "flags": flags,
-                    "overlap_jaccard": round(overlap, 4),
-                    "mac_excerpt": short_excerpt(mac_text),
-                    "deepseek_excerpt": short_excerpt(deep_text),
-                }
-            )
+    harmonized_chunks = [chunk for chunk, _, _ in results]
+    meta_pages = [meta for _, meta, _ in results]
+    review_queue = [item for _, _, item in results if item is not None]
 
     return {
-        "harmonized_text": "\n".join(harmonized_chunks).strip() + "\n",
+        "harmonized_chunks": harmonized_chunks,
         "meta_pages": meta_pages,
         "review_queue": review_queue,
         "total_pages": len(all_pages),
@@ -296,7 +490,14 @@ def write_outputs(output_dir: Path, result: Dict[str, object], run_meta: Dict[st
     review_md = output_dir / "review_queue.md"
     review_jsonl = output_dir / "review_queue.jsonl"
 
-    harmonized_md.write_text(result["harmonized_text"], encoding="utf-8")
+    # Chunk by chunk rather than one joined copy of the whole book; the file
+    # reads the same as "\n".join(chunks).strip() + "\n".
+    chunks = result["harmonized_chunks"]
+    with harmonized_md.open("w", encoding="utf-8") as fh:
+        for chunk in chunks[:-1]:
+            fh.write(chunk)
+            fh.write("\n")
+        fh.write(chunks[-1].rstrip() + "\n" if chunks else "\n")
 
     meta_payload = {
         "run": run_meta,
@@ -306,7 +507,7 @@ def write_outputs(output_dir: Path, result: Dict[str, object], run_meta: Dict[st
         },
         "pages": result["meta_pages"],
     }
-    meta_json.write_text(json.dumps(meta_payload, indent=2, ensure_ascii=False), encoding="utf-8")
+    meta_json.write_bytes(json_dump_bytes(meta_payload))
 
     review_lines = [
         "# OCR Harmonization Review Queue",
@@ -334,9 +535,9 @@ def write_outputs(output_dir: Path, result: Dict[str, object], run_meta: Dict[st
         )
     review_md.write_text("\n".join(review_lines), encoding="utf-8")
 
-    with review_jsonl.open("w", encoding="utf-8") as fh:
+    with review_jsonl.open("wb") as fh:
         for item in result["review_queue"]:
-            fh.write(json.dumps(item, ensure_ascii=False) + "\n")
+            fh.write(json_line_bytes(item))
 
     return {
         "harmonized_md": harmonized_md,
@@ -360,16 +561,16 @@ def main() -> int:
     mac_text = load_text(args.mac_path)
 
     deepseek_input_mode = "result.cleaned.md"
-    deep_text = ""
+    deep_text = b""
     if args.deepseek_path.exists():
         deep_text = load_text(args.deepseek_path)
     else:
         try:
-            deep_text = synthesize_markered_text_from_deepseek_pages(args.deepseek_path.parent)
+            deep_text = synthesize_markered_text_from_deepseek_pages(args.deepseek_path.parent).encode("utf-8")
             deepseek_input_mode = "synthesized_from_pages"
         except FileNotFoundError:
             deepseek_input_mode = "missing_deepseek_fallback_macos_only"
-            deep_text = ""
+            deep_text = b""
 
     mac_pages = parse_pages(mac_text)
     deep_pages = parse_pages(deep_text) if deep_text.strip() else {}
@@ -2,6 +2,7 @@
 from __future__ import annotations
 
 import json
+import os
 import re
 import sys
 from dataclasses import dataclass
@@ -14,6 +15,26 @@ if str(REPO_ROOT) not in sys.path:
 
 from config.pipeline_paths import get_paths
 
+try:
+    import orjson
+except ImportError:  # optional speedup; stdlib json is the fallback
+    orjson = None
+
+json_loads = orjson.loads if orjson else json.loads
+
+
+def parse_row(line: bytes):
+    # Rows go to the parser as raw bytes; only a row that is not valid UTF-8
+    # takes the replace-decode path, so it still parses instead of dropping.
+    try:
+        return json_loads(line)
+    except ValueError:
+        try:
+            line.decode("utf-8")
+        except UnicodeDecodeError:
+            return json.loads(line.decode("utf-8", errors="replace"))
+        raise
+
 P = get_paths()
 MEMORY_ROOT = P.cleaned_root / "memory"
 MANIFEST_PATH = MEMORY_ROOT / "10_consolidated" / "entity_manifest.jsonl"
@@ -22,6 +43,15 @@ SESSIONS_ROOT = MEMORY_ROOT / "10_consolidated" / "campaign" / "sessions"
 RUN_NOTES_ROOT = MEMORY_ROOT / "00_sources" / "run_notes"
 WP_RUN_NOTES_ROOT = MEMORY_ROOT / "wordpress_ingest" / "Run Notes"
 
+SEPARATOR_RE = re.compile(r"[-_]+")
+WS_RE = re.compile(r"\s+")
+MD_MARKUP_RE = re.compile(r"[*_`#>\-\u2022]+")
+MERMAID_BRACKETS_RE = re.compile(r"[{}\[\]()<>]")
+SOURCE_REF_RE = re.compile(r"Source:\s*`([^`]+)`")
+SESSION_FILE_RE = re.compile(r"(20\d{2}-\d{2}-\d{2})\.md$")
+# Heading / metadata lines that never make a useful session summary.
+SUMMARY_SKIP_RE = re.compile(r"#|- source chunks:|- type:|source:|chunk", re.IGNORECASE)
+
 
 @dataclass
 class IntroEvent:
@@ -40,15 +70,15 @@ class SessionEvent:
 
 
 def display_name(entity_slug: str) -> str:
-    label = re.sub(r"[-_]+", " ", (entity_slug or "").strip())
-    label = re.sub(r"\s+", " ", label).strip()
+    label = SEPARATOR_RE.sub(" ", (entity_slug or "").strip())
+    label = WS_RE.sub(" ", label).strip()
     return label.title() if label else "Unknown Entity"
 
 
 def normalize_text(raw: str, limit: int = 80) -> str:
     text = (raw or "").replace("\ufeff", " ")
-    text = re.sub(r"[*_`#>\-\u2022]+", " ", text)
-    text = re.sub(r"\s+", " ", text).strip()
+    text = MD_MARKUP_RE.sub(" ", text)
+    text = WS_RE.sub(" ", text).strip()
     if not text:
         return "first campaign mention"
     if len(text) <= limit:
@@ -61,40 +91,44 @@ def manifest_rows(path: Path) -> list[dict]:
     if not path.exists():
         raise FileNotFoundError(f"Missing manifest: {path}")
     rows: list[dict] = []
-    for raw in path.read_text(encoding="utf-8", errors="replace").splitlines():
-        line = raw.strip()
-        if not line:
-            continue
-        try:
-            obj = json.loads(line)
-        except json.JSONDecodeError:
-            continue
-        if isinstance(obj, dict):
-            rows.append(obj)
+    with path.open("rb") as f:
+        for raw in f:
+            line = raw.strip()
+            if not line:
+                continue
+            try:
+                obj = parse_row(line)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(obj, dict):
+                rows.append(obj)
     return rows
 
 
 def first_timeline_event(timeline_path: Path) -> dict | None:
     if not timeline_path.exists():
         return None
-    for raw in timeline_path.read_text(encoding="utf-8", errors="replace").splitlines():
-        line = raw.strip()
-        if not line:
-            continue
-        try:
-            obj = json.loads(line)
-        except json.JSONDecodeError:
-            continue
-        if isinstance(obj, dict):
-            return obj
+    # Stop at the first parseable row instead of reading the whole timeline.
+    # Rows are handed to the parser as raw bytes; no text decode pass.
+    with timeline_path.open("rb") as f:
+        for raw in f:
+            line = raw.strip()
+            if not line:
+                continue
+            try:
+                obj = parse_row(line)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(obj, dict):
+                return obj
     return None
 
 
 def pick_timeline_file(row: dict) -> Path | None:
     for raw_path in row.get("jsonl_files", []):
-        candidate = Path(str(raw_path))
-        if candidate.name.endswith(".timeline.jsonl"):
-            return candidate
+        raw = str(raw_path)
+        if raw.endswith(".timeline.jsonl"):
+            return Path(raw)
     return None
 
 
@@ -141,29 +175,18 @@ def _sanitize_mermaid_text(text: str) -> str:
     out = out.replace(";", " -")
     out = out.replace('"', "")
     out = out.replace("`", "")
-    out = re.sub(r"[{}\[\]()<>]", "", out)
-    out = re.sub(r"\s+", " ", out).strip()
+    out = MERMAID_BRACKETS_RE.sub("", out)
+    out = WS_RE.sub(" ", out).strip()
     return out
 
 
 def summarize_session_text(md_text: str) -> str:
     lines = [ln.strip() for ln in md_text.splitlines()]
-    blacklist = (
-        "#",
-        "##",
-        "###",
-        "- source chunks:",
-        "- type:",
-        "source:",
-        "## consolidated notes",
-        "chunk",
-    )
     candidates: list[str] = []
     for line in lines:
         if not line:
             continue
-        low = line.lower()
-        if any(low.startswith(b) for b in blacklist):
+        if SUMMARY_SKIP_RE.match(line):
             continue
         if len(line) < 20:
             continue
@@ -181,13 +204,19 @@ def summarize_session_text(md_text: str) -> str:
     return first
 
 
+def list_md(root: Path) -> list[str]:
+    # One scandir pass; names only, no per-entry Path objects or glob matching.
+    if not root.is_dir():
+        return []
+    with os.scandir(root) as it:
+        return sorted(e.name for e in it if e.name.endswith(".md") and e.is_file())
+
+
 def _source_lookup() -> dict[str, Path]:
     out: dict[str, Path] = {}
     for root in [RUN_NOTES_ROOT, WP_RUN_NOTES_ROOT]:
-        if not root.exists():
-            continue
-        for p in root.glob("*.md"):
-            out[p.name] = p
+        for name in list_md(root):
+            out[name] = root / name
     return out
 
 
@@ -195,11 +224,13 @@ def _extract_source_refs(session_text: str, src_map: dict[str, Path]) -> list[st
     refs: list[str] = []
     seen = set()
     for raw in session_text.splitlines():
-        s = raw.strip()
-        m = re.search(r"Source:\s*`([^`]+)`", s)
+        # Cheap substring gate; most session lines are note text, not Source: refs.
+        if "Source:" not in raw:
+            continue
+        m = SOURCE_REF_RE.search(raw)
         if not m:
             continue
-        src_name = Path(m.group(1).strip()).name
+        src_name = m.group(1).strip().rstrip("/").rpartition("/")[2]
         full = src_map.get(src_name)
         ref = str(full) if full else src_name
         if ref in seen:
@@ -216,13 +247,12 @@ def build_session_events() -> list[SessionEvent]:
 
     src_map = _source_lookup()
 
-    for p in sorted(SESSIONS_ROOT.glob("*.md")):
-        if p.name.upper() == "SESSION_INDEX.MD":
-            continue
-        m = re.match(r"(20\d{2}-\d{2}-\d{2})\.md$", p.name)
+    for name in list_md(SESSIONS_ROOT):
+        m = SESSION_FILE_RE.match(name)
         if not m:
             continue
         date = m.group(1)
+        p = SESSIONS_ROOT / name
         text = p.read_text(encoding="utf-8", errors="replace")
         events.append(
             SessionEvent(
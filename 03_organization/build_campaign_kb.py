@@ -1,8 +1,14 @@
 #!/usr/bin/env python3
 import argparse
 import json
+import os
 import re
 import sys
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from itertools import accumulate, groupby
+from operator import itemgetter
 from pathlib import Path
 
 REPO_ROOT = Path(__file__).resolve().parents[1]
@@ -11,6 +17,20 @@ if str(REPO_ROOT) not in sys.path:
 
 from config.pipeline_paths import get_paths
 
+try:
+    import orjson
+except ImportError:  # optional speedup; stdlib json is the fallback
+    orjson = None
+
+json_loads = orjson.loads if orjson else json.loads
+
+
+def json_dump_bytes(obj) -> bytes:
+    # Same layout as json.dumps(indent=2, ensure_ascii=False) plus a newline.
+    if orjson:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE)
+    return (json.dumps(obj, indent=2, ensure_ascii=False) + '\n').encode('utf-8')
+
 P = get_paths()
 GAME_LOGS = P.raw_root / 'Game_Logs'
 WP_RUN_NOTES = P.memory_root / 'wordpress_ingest' / 'Run Notes'
@@ -21,12 +41,95 @@ CATALOG = OUT / 'entity_catalog.json'
 OUT.mkdir(parents=True, exist_ok=True)
 ENT.mkdir(parents=True, exist_ok=True)
 
+SLUG_RE = re.compile(r'[^a-z0-9-]+')
+NON_WORD_RE = re.compile(r'\W')
 DEATH_HINTS = re.compile(r'\b(died|dead|killed|slain|passed away|deceased|death)\b', re.IGNORECASE)
 ALIVE_HINTS = re.compile(r'\b(alive|survived|returns?|back again|still active|still around)\b', re.IGNORECASE)
+# Entity pages are small and independent; overlap their open/write/close.
+WRITE_WORKERS = 8
+
+
+def _keyword_re(keys):
+    # Plain substring alternation: one C-level search instead of a Python any() loop.
+    return re.compile('|'.join(re.escape(k) for k in keys))
+
+
+FACET_KEYWORDS = {
+    'physical': ['looks', 'appearance', 'tall', 'short', 'hair', 'eyes', 'face', 'tattoo', 'scar'],
+    'capabilities': ['can ', 'able to', 'skill', 'hacking', 'deck', 'combat', 'spell', 'drone', 'pilot'],
+    'quirks': ['weird', 'odd', 'meme', 'quirk', 'obsess', 'habit', 'insane', 'eccentric'],
+    'equipment': ['deck', 'gun', 'shotgun', 'sword', 'armor', 'vehicle', 'drone', 'transceiver', 'gear'],
+}
+FACET_RES = {k: _keyword_re(keys) for k, keys in FACET_KEYWORDS.items()}
+TAG_RES = {
+    'matrix-active': _keyword_re(['matrix', 'host', 'deck', 'security', 'network']),
+    'field-tech': _keyword_re(['drone', 'vehicle', 'rig', 'vcr']),
+    'social-connector': _keyword_re(['contact', 'deal', 'negotiat', 'introduce', 'ask']),
+    'combat-capable': _keyword_re(['attack', 'fight', 'shot', 'combat', 'gun', 'sword']),
+}
+NOTABLE_RE = _keyword_re(['attack', 'run', 'mission', 'contact', 'plan', 'host', 'matrix', 'drone', 'fed', 'mayor', 'deal', 'conflict'])
 
 
+# Canonical names are a bounded set and each is slugified several times.
+@lru_cache(maxsize=None)
 def slugify(name: str) -> str:
-    return re.sub(r'[^a-z0-9-]+', '-', name.lower().replace('/', '-').replace(' ', '-')).strip('-')
+    return SLUG_RE.sub('-', name.lower().replace('/', '-').replace(' ', '-')).strip('-')
+
+
+# Page for catalog entities with no cited refs; matches the full renderer's
+# output for an empty ref list without running summarize_entity.
+STUB_PAGE = """{heading}
+
+- Entity type: **{etype}**
+- Synonyms: {synonyms}
+- Citation count: **0**
+
+## Description
+
+{canonical} has no cited campaign references yet.
+
+## Summary
+
+{canonical} currently has insufficient campaign data for a reliable profile.
+
+## Cindy's Opinion
+
+Cindy's take: still a mystery. I'd keep this one on my watchlist until we gather more intel.
+
+## Profile facets
+
+### Physical description
+_Not clearly established in current notes._
+
+### Capabilities
+_Not clearly established in current notes._
+
+### Quirks
+_Not clearly established in current notes._
+
+### Equipment
+_Not clearly established in current notes._
+
+## Timeline (abbreviated)
+
+_No timeline events yet._
+
+## Notable events
+
+_No notable events identified yet._
+
+## Passing / death record
+
+_No confirmed passing/death reference found in current notes._
+
+## Continuity notes
+
+_No major continuity conflicts detected in current notes._
+
+## References
+
+_No references recorded._
+"""
 
 
 def extract_session_title(path: Path):
@@ -37,7 +140,7 @@ def extract_session_title(path: Path):
 def load_catalog(path: Path):
     if not path.exists():
         raise FileNotFoundError(f'Missing entity catalog: {path}')
-    raw = json.loads(path.read_text(encoding='utf-8'))
+    raw = json_loads(path.read_bytes())
     rows = raw.get('entities', []) if isinstance(raw, dict) else raw
 
     catalog = []
@@ -69,17 +172,83 @@ def build_alias_patterns(catalog):
                 aliases.append((val.strip(), canonical))
     aliases.sort(key=lambda x: len(x[0]), reverse=True)
 
-    seen = set()
-    pats = []
+    # One alternation (longest alias first) so each line is scanned once
+    # regardless of catalog size. It sits in a lookahead so every start
+    # position is tried, catching aliases that overlap an earlier match.
+    aliases_by_key = {}
     for alias, canonical in aliases:
-        key = alias.lower()
-        if key in seen:
+        aliases_by_key.setdefault(alias.lower(), canonical)
+    if not aliases_by_key:
+        return None, {}
+    combined = re.compile(
+        r'(?=(?<!\w)(' + '|'.join(re.escape(a) for a in aliases_by_key) + r')(?!\w))',
+        re.IGNORECASE,
+    )
+    # key -> (rank, canonical, aliases nested inside it). A match only reports
+    # the longest alias at its start, so shorter aliases it contains (Renraku
+    # inside Renraku Arcology) are implied by it; rank keeps hits in the old
+    # longest-alias-first order.
+    alias_info = {}
+    for rank, (key, canonical) in enumerate(aliases_by_key.items()):
+        starts = [0] + [m.end() for m in NON_WORD_RE.finditer(key)]
+        ends = [m.start() for m in NON_WORD_RE.finditer(key)] + [len(key)]
+        nested = tuple({
+            key[i:j] for i in starts for j in ends
+            if i < j and j - i < len(key) and key[i:j] in aliases_by_key
+        })
+        alias_info[key] = (rank, canonical, nested)
+    return combined, alias_info
+
+
+def _ordered_hits(alias_info, keys: set) -> list[str]:
+    for key in list(keys):
+        keys.update(alias_info[key][2])
+    hits = []
+    for key in sorted(keys, key=lambda k: alias_info[k][0]):
+        canonical = alias_info[key][1]
+        if canonical not in hits:
+            hits.append(canonical)
+    return hits
+
+
+def find_entities(patterns, text: str) -> list[str]:
+    combined, alias_info = patterns
+    if combined is None:
+        return []
+    keys = {m.group(1).lower() for m in combined.finditer(text)}
+    return _ordered_hits(alias_info, {k for k in keys if k in alias_info})
+
+
+def scan_lines(patterns, txt: str, lines: list[str]):
+    # Run the combined alias regex over the whole file in one C-level pass and
+    # bucket matched aliases by line, so lines without a candidate cost no
+    # Python work. Aliases never span a newline, so each line gets the same
+    # hits, in the same order, as searching it alias by alias.
+    # lines must come from txt.splitlines(keepends=True) so offsets line up.
+    combined, alias_info = patterns
+    if combined is None:
+        return []
+    starts = list(accumulate(map(len, lines), initial=0))
+    by_line = {}
+    short = set()  # lines under 12 chars are never cited; check each once
+    for m in combined.finditer(txt):
+        key = m.group(1).lower()
+        if key not in alias_info:
             continue
-        seen.add(key)
-        pats.append((canonical, re.compile(r'(?<!\w)' + re.escape(alias) + r'(?!\w)', re.IGNORECASE)))
-    return pats
+        i = bisect_right(starts, m.start())
+        keys = by_line.get(i)
+        if keys is None:
+            if i in short:
+                continue
+            if len(lines[i - 1].strip()) < 12:
+                short.add(i)
+                continue
+            keys = by_line[i] = set()
+        keys.add(key)
+    return [(i, _ordered_hits(alias_info, keys)) for i, keys in by_line.items()]
 
 
+@lru_cache(maxsize=None)
 def group_name(entity_type: str) -> str:
     t = (entity_type or '').strip().upper()
     if t == 'PC':
@@ -98,34 +267,42 @@ def entity_heading(entity_type: str, canonical: str) -> str:
     return f'# Campaign Entity: {canonical}'
 
 
+def ref_tags(low: str) -> frozenset:
+    return frozenset(tag for tag, rx in TAG_RES.items() if rx.search(low))
+
+
 def extract_facets(refs: list[dict]):
-    facets = {
-        'physical': ['looks', 'appearance', 'tall', 'short', 'hair', 'eyes', 'face', 'tattoo', 'scar'],
-        'capabilities': ['can ', 'able to', 'skill', 'hacking', 'deck', 'combat', 'spell', 'drone', 'pilot'],
-        'quirks': ['weird', 'odd', 'meme', 'quirk', 'obsess', 'habit', 'insane', 'eccentric'],
-        'equipment': ['deck', 'gun', 'shotgun', 'sword', 'armor', 'vehicle', 'drone', 'transceiver', 'gear'],
-    }
-    out = {k: [] for k in facets}
+    out = {k: [] for k in FACET_RES}
+    seen = {k: set() for k in FACET_RES}
+    open_facets = len(FACET_RES)
     for r in refs:
+        if not open_facets:
+            break
         t = r['text']
-        low = t.lower()
-        for k, keys in facets.items():
+        low = r['low']
+        for k, rx in FACET_RES.items():
             if len(out[k]) >= 3:
                 continue
-            if any(x in low for x in keys):
-                src = f"{r['source_file']}#L{r['line']}"
-                if not any(e['text'] == t for e in out[k]):
-                    out[k].append({'text': t, 'source': src})
+            if rx.search(low) and t not in seen[k]:
+                seen[k].add(t)
+                out[k].append({'text': t, 'source': f"{r['source_file']}#L{r['line']}"})
+                if len(out[k]) >= 3:
+                    open_facets -= 1
     return out
 
 
 def detect_continuity_notes(refs: list[dict]):
     notes = []
-    death_refs = [r for r in refs if DEATH_HINTS.search(r['text'])]
-    alive_refs = [r for r in refs if ALIVE_HINTS.search(r['text'])]
-    if death_refs and alive_refs:
-        d = death_refs[0]
-        a = alive_refs[0]
+    # Only the first death and first survival mention are cited; stop once both are found.
+    d = a = None
+    for r in refs:
+        if d is None and DEATH_HINTS.search(r['text']):
+            d = r
+        if a is None and ALIVE_HINTS.search(r['text']):
+            a = r
+        if d is not None and a is not None:
+            break
+    if d is not None and a is not None:
         notes.append({
             'text': 'Possible continuity contradiction: death/defeat language appears alongside later/alternate survival language.',
             'sources': [f"{d['source_file']}#L{d['line']}", f"{a['source_file']}#L{a['line']}"]
@@ -145,17 +322,9 @@ def summarize_entity(canonical: str, refs: list[dict], entity_type: str):
         }
 
     first = refs[0]
-    texts = ' '.join(r['text'] for r in refs).lower()
-
-    tags = []
-    if any(k in texts for k in ['matrix', 'host', 'deck', 'security', 'network']):
-        tags.append('matrix-active')
-    if any(k in texts for k in ['drone', 'vehicle', 'rig', 'vcr']):
-        tags.append('field-tech')
-    if any(k in texts for k in ['contact', 'deal', 'negotiat', 'introduce', 'ask']):
-        tags.append('social-connector')
-    if any(k in texts for k in ['attack', 'fight', 'shot', 'combat', 'gun', 'sword']):
-        tags.append('combat-capable')
+    # Refs are tagged once when collected; an entity's tags are their union.
+    tagged = set().union(*(r['tags'] for r in refs))
+    tags = [tag for tag in TAG_RES if tag in tagged]
 
     description = (
         f"{canonical} is a {' and '.join(tags) if tags else 'recurring'} campaign figure "
@@ -202,7 +371,7 @@ def summarize_entity(canonical: str, refs: list[dict], entity_type: str):
             break
         if txt in seen:
             continue
-        if any(k in txt.lower() for k in ['attack', 'run', 'mission', 'contact', 'plan', 'host', 'matrix', 'drone', 'fed', 'mayor', 'deal', 'conflict']):
+        if NOTABLE_RE.search(r['low']):
             notable.append({
                 'session': r['session'],
                 'text': txt,
@@ -262,14 +431,40 @@ def _matches_target(canonical: str, target: str | None) -> bool:
     return slugify(canonical) == slugify(target)
 
 
-def main(target: str | None = None):
+# Alias matcher rebuilt once per pool worker instead of pickled per task.
+_worker_patterns = None
+
+
+def _init_scan_worker(catalog):
+    global _worker_patterns
+    _worker_patterns = build_alias_patterns(catalog)
+
+
+def scan_file(f: Path, patterns=None) -> list[dict]:
+    patterns = patterns or _worker_patterns
+    txt = f.read_text(encoding='utf-8', errors='replace')
+    session = extract_session_title(f)
+    source_file = str(f)
+    # keepends: one list serves both the offset table and the context lines,
+    # which are stripped before use anyway.
+    lines = txt.splitlines(keepends=True)
+    recs = []
+    for i, hits in scan_lines(patterns, txt, lines):
+        text = _line_with_context(lines, i)
+        low = text.lower()
+        recs.append({'session': session, 'source_file': source_file, 'line': i, 'text': text, 'low': low, 'entities': hits, 'tags': ref_tags(low)})
+    return recs
+
+
+def main(target: str | None = None, workers: int = 1):
     catalog = load_catalog(CATALOG)
     patterns = build_alias_patterns(catalog)
     logs = sorted(GAME_LOGS.glob('*.md'))
     wp_logs = sorted(WP_RUN_NOTES.glob('*.md')) if WP_RUN_NOTES.exists() else []
 
     entries = []
-    entity_refs = {row['canonical']: [] for row in catalog}
+    # (canonical, rec) pairs, grouped into entity_refs once scanning is done.
+    entity_hits = []
     entity_meta = {row['canonical']: row for row in catalog}
 
     player_inputs = []
@@ -278,29 +473,20 @@ def main(target: str | None = None):
             if not line.strip():
                 continue
             try:
-                player_inputs.append(json.loads(line))
+                player_inputs.append(json_loads(line))
             except Exception:
                 continue
 
-    for f in logs + wp_logs:
-        txt = f.read_text(encoding='utf-8', errors='replace')
-        session = extract_session_title(f)
-        lines = txt.splitlines()
-        for i, line in enumerate(lines, start=1):
-            s = line.strip()
-            if len(s) < 12:
-                continue
-            hits = []
-            for canonical, pat in patterns:
-                if pat.search(s) and canonical not in hits:
-                    hits.append(canonical)
-            if not hits:
-                continue
-
-            rec = {'session': session, 'source_file': str(f), 'line': i, 'text': _line_with_context(lines, i), 'entities': hits}
+    files = logs + wp_logs
+    if workers > 1 and len(files) > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_scan_worker, initargs=(catalog,)) as ex:
+            scanned = list(ex.map(scan_file, files, chunksize=4))
+    else:
+        scanned = [scan_file(f, patterns) for f in files]
+    for recs in scanned:
+        for rec in recs:
             entries.append(rec)
-            for c in hits:
-                entity_refs[c].append(rec)
+            entity_hits.extend((c, rec) for c in rec['entities'])
 
     # Player-input submissions behave like campaign notes with explicit attribution.
     for i, item in enumerate(player_inputs, start=1):
@@ -311,27 +497,33 @@ def main(target: str | None = None):
         player = (item.get('player') or 'Unknown Player').strip()
         date = (item.get('date') or 'undated').strip()
 
-        hits = []
-        for canonical, pat in patterns:
-            if pat.search(txt) and canonical not in hits:
-                hits.append(canonical)
-        for canonical in entity_refs.keys():
+        hits = find_entities(patterns, txt)
+        for canonical in entity_meta:
             if canonical.lower() == entity_hint and canonical not in hits:
                 hits.append(canonical)
 
         if not hits:
             continue
 
+        text = f"[{player}] {txt}"[:320]
+        low = text.lower()
         rec = {
             'session': f'Player Input ({date})',
             'source_file': str(PLAYER_INPUT_FILE),
             'line': i,
-            'text': f"[{player}] {txt}"[:320],
+            'text': text,
+            'low': low,
             'entities': hits,
+            'tags': ref_tags(low),
         }
         entries.append(rec)
-        for c in hits:
-            entity_refs[c].append(rec)
+        entity_hits.extend((c, rec) for c in hits)
+
+    # Stable sort keeps each entity's refs in scan order; keys follow catalog order.
+    entity_hits.sort(key=itemgetter(0))
+    grouped = {c: [rec for _, rec in g] for c, g in groupby(entity_hits, key=itemgetter(0))}
+    # Only entities with hits get a ref list; the rest are rendered from STUB_PAGE.
+    entity_refs = grouped
 
     idx_md = OUT / 'CAMPAIGN_INDEX.md'
     lines = [
@@ -348,8 +540,8 @@ def main(target: str | None = None):
     ]
 
     groups = {'PCs': [], 'NPCs': [], 'Unclassified': []}
-    for canonical, refs in entity_refs.items():
-        groups[group_name(entity_meta[canonical].get('type', 'Unclassified'))].append((canonical, refs))
+    for canonical, meta in entity_meta.items():
+        groups[group_name(meta.get('type', 'Unclassified'))].append((canonical, entity_refs.get(canonical, [])))
 
     for grp in ['PCs', 'NPCs', 'Unclassified']:
         items = groups[grp]
@@ -365,13 +557,18 @@ def main(target: str | None = None):
 
     idx_md.write_text('\n'.join(lines).rstrip() + '\n', encoding='utf-8')
 
-    for canonical, refs in entity_refs.items():
+    pages = []
+    for canonical, meta in entity_meta.items():
         if not _matches_target(canonical, target):
             continue
-        meta = entity_meta[canonical]
         slug = slugify(canonical)
         p = ENT / f'{slug}.md'
         syn = ', '.join(meta['synonyms']) if meta['synonyms'] else '_None_'
+        refs = entity_refs.get(canonical)
+        if not refs:
+            page = STUB_PAGE.format(heading=entity_heading(meta.get('type', 'Unclassified'), canonical), etype=meta.get('type', 'Unclassified'), synonyms=syn, canonical=canonical)
+            pages.append((p, page.encode('utf-8')))
+            continue
         agg = summarize_entity(canonical, refs, meta.get('type', 'Unclassified'))
 
         ref_map = {}
@@ -463,7 +660,10 @@ def main(target: str | None = None):
             for i, src in enumerate(ref_list, start=1):
                 out.append(f"- <a id='ref-{i}'></a> [{i}] `{src}`")
 
-        p.write_text('\n'.join(out).rstrip() + '\n', encoding='utf-8')
+        pages.append((p, ('\n'.join(out).rstrip() + '\n').encode('utf-8')))
+
+    with ThreadPoolExecutor(max_workers=WRITE_WORKERS) as ex:
+        list(ex.map(lambda pb: pb[0].write_bytes(pb[1]), pages))
 
     payload = {
         'scope': 'campaign_only',
@@ -471,12 +671,12 @@ def main(target: str | None = None):
             c: {
                 'type': entity_meta[c].get('type', 'Unclassified'),
                 'synonyms': entity_meta[c].get('synonyms', []),
-                'citation_count': len(refs),
+                'citation_count': len(entity_refs.get(c, [])),
             }
-            for c, refs in entity_refs.items()
+            for c in entity_meta
         }
     }
-    (OUT / 'index.json').write_text(json.dumps(payload, indent=2, ensure_ascii=False) + '\n', encoding='utf-8')
+    (OUT / 'index.json').write_bytes(json_dump_bytes(payload))
     print('wrote', idx_md)
     print('wrote', OUT / 'index.json')
 
@@ -484,5 +684,6 @@ def main(target: str | None = None):
 if __name__ == '__main__':
     ap = argparse.ArgumentParser()
     ap.add_argument('--target', help='Canonical entity name (or partial) to rebuild specific campaign entity page(s).')
+    ap.add_argument('--workers', type=int, default=os.cpu_count(), help='Processes used to scan run-note files.')
     args = ap.parse_args()
-    main(target=args.target)
+    main(target=args.target, workers=args.workers)
@@ -1,9 +1,11 @@
 #!/usr/bin/env python3
 from __future__ import annotations
 
+import os
 import re
 import sys
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 REPO_ROOT = Path(__file__).resolve().parents[1]
@@ -19,6 +21,8 @@ WP_RUN_NOTES = MEMORY_ROOT / "wordpress_ingest" / "Run Notes"
 OUT = MEMORY_ROOT / "10_consolidated" / "campaign" / "sessions"
 
 DATE_RE = re.compile(r"(20\d{2})[-_/](\d{2})[-_/](\d{2})")
+# Session files are independent; overlap their open/write/close.
+WRITE_WORKERS = 8
 
 
 def norm_date(raw: str) -> str | None:
@@ -28,6 +32,14 @@ def norm_date(raw: str) -> str | None:
     return f"{m.group(1)}-{m.group(2)}-{m.group(3)}"
 
 
+def list_md(root: Path) -> list[str]:
+    # One scandir pass; names only, no per-entry Path objects or glob matching.
+    if not root.is_dir():
+        return []
+    with os.scandir(root) as it:
+        return sorted(e.name for e in it if e.name.endswith(".md") and e.is_file())
+
+
 def file_fallback_date(path: Path) -> str | None:
     return norm_date(path.name)
 
@@ -36,23 +48,24 @@ def extract_chunks(path: Path) -> list[dict]:
     text = path.read_text(encoding="utf-8", errors="replace")
     lines = text.splitlines()
     chunks: list[dict] = []
+    source = str(path)
 
     active_date: str | None = None
     active_start = 1
-    buf: list[str] = []
+    # Pending chunk body is lines[buf_start:end_line]; sliced once per flush.
+    buf_start = 0
 
     def flush(end_line: int):
-        nonlocal buf, active_date, active_start
-        content = "\n".join(buf).strip()
+        content = "\n".join(lines[buf_start:end_line]).strip()
         if active_date and content:
             chunks.append({
                 "date": active_date,
-                "source": str(path),
+                "source": source,
+                "source_name": path.name,
                 "start_line": active_start,
                 "end_line": end_line,
                 "content": content,
             })
-        buf = []
 
     for i, line in enumerate(lines, start=1):
         s = line.strip()
@@ -61,6 +74,7 @@ def extract_chunks(path: Path) -> list[dict]:
 
         if heading and inline_date:
             flush(i - 1)
+            buf_start = i
             active_date = inline_date
             active_start = i + 1
             continue
@@ -70,8 +84,6 @@ def extract_chunks(path: Path) -> list[dict]:
             active_date = inline_date
             active_start = i
 
-        buf.append(line)
-
     flush(len(lines))
 
     # fallback: whole file mapped to filename date if no dated chunks found
@@ -82,7 +94,8 @@ def extract_chunks(path: Path) -> list[dict]:
             if content:
                 chunks.append({
                     "date": d,
-                    "source": str(path),
+                    "source": source,
+                    "source_name": path.name,
                     "start_line": 1,
                     "end_line": len(lines),
                     "content": content,
@@ -93,18 +106,15 @@ def extract_chunks(path: Path) -> list[dict]:
 
 def main() -> None:
     OUT.mkdir(parents=True, exist_ok=True)
-    note_files = []
-    if RUN_NOTES.exists():
-        note_files.extend(sorted(RUN_NOTES.glob("*.md")))
-    if WP_RUN_NOTES.exists():
-        note_files.extend(sorted(WP_RUN_NOTES.glob("*.md")))
+    note_files = [root / name for root in (RUN_NOTES, WP_RUN_NOTES) for name in list_md(root)]
 
     by_date: dict[str, list[dict]] = defaultdict(list)
     for f in note_files:
         for ch in extract_chunks(f):
             by_date[ch["date"]].append(ch)
 
-    # write per-session files
+    # render per-session files, then write them in parallel
+    pages = []
     for d, items in sorted(by_date.items()):
         items.sort(key=lambda x: (x["source"], x["start_line"]))
         out = [
@@ -117,7 +127,7 @@ def main() -> None:
             "",
         ]
         for idx, it in enumerate(items, start=1):
-            src_name = Path(it["source"]).name
+            src_name = it["source_name"]
             out.append(f"### Chunk {idx} — {src_name} (L{it['start_line']}-L{it['end_line']})")
             out.append("")
             out.append(it["content"])
@@ -125,7 +135,10 @@ def main() -> None:
             out.append(f"Source: `{src_name}`")
             out.append("")
 
-        (OUT / f"{d}.md").write_text("\n".join(out).rstrip() + "\n", encoding="utf-8")
+        pages.append((OUT / f"{d}.md", ("\n".join(out).rstrip() + "\n").encode("utf-8")))
+
+    with ThreadPoolExecutor(max_workers=WRITE_WORKERS) as ex:
+        list(ex.map(lambda pb: pb[0].write_bytes(pb[1]), pages))
 
     idx = [
         "# Campaign Sessions Index",
@@ -2,6 +2,7 @@
 from __future__ import annotations
 
 import json
+import os
 import re
 from pathlib import Path
 import sys
@@ -12,67 +13,87 @@ if str(REPO_ROOT) not in sys.path:
 
 from config.pipeline_paths import get_paths
 
+try:
+    import orjson
+except ImportError:  # optional speedup; stdlib json is the fallback
+    orjson = None
+
+
+def json_line_bytes(obj) -> bytes:
+    # One JSONL row, UTF-8, non-ASCII kept as is.
+    if orjson:
+        return orjson.dumps(obj, option=orjson.OPT_APPEND_NEWLINE)
+    return (json.dumps(obj, ensure_ascii=False) + '\n').encode('utf-8')
+
 P = get_paths()
 MEMORY_ROOT = Path(str(P.cleaned_root / 'memory'))
 CONSOLIDATED_ROOT = MEMORY_ROOT / '10_consolidated'
 OUT = CONSOLIDATED_ROOT / 'entity_manifest.jsonl'
+ENTITY_PREFIX_RE = re.compile(r'^entity\s*:\s*')
+NON_ALNUM_RE = re.compile(r'[^a-z0-9]+')
 
 
 def collect(scope: str, root: Path):
-    rows = []
+    # Yields one manifest row per entity, in entity order.
     if not root.exists():
-        return rows
+        return
+    # (name, suffix) per file, grouped by entity; scandir entries cache the
+    # file-type check, and Paths are only built for names that are emitted.
     groups = {}
-    for f in root.iterdir():
-        if not f.is_file():
-            continue
-        if f.suffix not in {'.md', '.jsonl'}:
-            continue
-        base = f.name.split('.', 1)[0]
-        groups.setdefault(base, []).append(f)
+    with os.scandir(root) as it:
+        for e in it:
+            stem, suffix = os.path.splitext(e.name)
+            if suffix not in {'.md', '.jsonl'} or not e.is_file():
+                continue
+            groups.setdefault(e.name.split('.', 1)[0], []).append((e.name, stem, suffix))
 
     for entity, files in sorted(groups.items()):
-        md_paths = [f for f in files if f.suffix == '.md']
+        md_names = [(name, stem) for name, stem, suffix in files if suffix == '.md']
         # If subsection files exist (<entity>.<section>.md), prefer those and skip the legacy monolith (<entity>.md)
-        has_subsections = any(f.name.count('.') >= 2 for f in md_paths)
+        has_subsections = any(name.count('.') >= 2 for name, _ in md_names)
         if has_subsections:
-            md_paths = [f for f in md_paths if f.stem != entity]
-        md_files = sorted([str(f) for f in md_paths], key=lambda s: Path(s).name.lower())
-        jsonl_files = sorted([str(f) for f in files if f.suffix == '.jsonl'], key=lambda s: Path(s).name.lower())
+            md_names = [(name, stem) for name, stem in md_names if stem != entity]
+        md_files = [str(root / name) for name in sorted((name for name, _ in md_names), key=str.lower)]
+        jsonl_files = [str(root / name) for name in sorted((name for name, _, suffix in files if suffix == '.jsonl'), key=str.lower)]
         if not md_files and not jsonl_files:
             continue
-        rows.append({
+        yield {
             'entity': entity,
             'scope': scope,
             'md_files': md_files,
             'jsonl_files': jsonl_files,
-        })
-    return rows
+        }
 
 
 def norm_entity_key(name: str) -> str:
     s = (name or '').strip().lower()
-    s = re.sub(r'^entity\s*:\s*', '', s)
-    s = re.sub(r'[^a-z0-9]+', '-', s).strip('-')
+    s = ENTITY_PREFIX_RE.sub('', s)
+    s = NON_ALNUM_RE.sub('-', s).strip('-')
     return s
 
 
 def main():
     OUT.parent.mkdir(parents=True, exist_ok=True)
 
-    campaign_rows = collect('campaign', CONSOLIDATED_ROOT / 'campaign' / 'entities')
-    general_rows = collect('general', CONSOLIDATED_ROOT / 'general' / 'entities')
-
+    # General scope wins on key collisions, so it is collected first; campaign
+    # rows are then filtered as they stream out of the scan.
+    general_rows = list(collect('general', CONSOLIDATED_ROOT / 'general' / 'entities'))
     general_keys = {norm_entity_key(r['entity']) for r in general_rows}
-    filtered_campaign = [r for r in campaign_rows if norm_entity_key(r['entity']) not in general_keys]
 
-    rows = filtered_campaign + general_rows
-
-    with OUT.open('w', encoding='utf-8') as f:
-        for row in rows:
-            f.write(json.dumps(row, ensure_ascii=False) + '\n')
+    rows = []
+    skipped = 0
+    for r in collect('campaign', CONSOLIDATED_ROOT / 'campaign' / 'entities'):
+        if norm_entity_key(r['entity']) in general_keys:
+            skipped += 1
+        else:
+            rows.append(r)
+    rows += general_rows
+
+    # Rows are encoded straight to bytes; the 1 MiB buffer turns them into a
+    # few large writes.
+    with OUT.open('wb', buffering=1 << 20) as f:
+        f.writelines(map(json_line_bytes, rows))
 
-    skipped = len(campaign_rows) - len(filtered_campaign)
     print(f'wrote {len(rows)} rows -> {OUT} (skipped {skipped} campaign duplicates with general scope)')
 
 
@@ -1,7 +1,10 @@
 #!/usr/bin/env python3
+import argparse
 import json
+import os
 import re
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
 REPO_ROOT = Path(__file__).resolve().parents[1]
@@ -15,10 +18,17 @@ HARM = P.outputs_root / 'harmonized_all'
 WP = P.memory_root / 'wordpress_ingest'
 OUT = P.memory_root / 'lore'
 ENT_DIR = OUT / 'entities'
+# Per-file scan results from the last run, keyed on path and reused while the
+# file's mtime/size and the entity patterns are unchanged.
+SCAN_CACHE = OUT / '.scan_cache.json'
+SCAN_CACHE_VERSION = 2
 OUT.mkdir(parents=True, exist_ok=True)
 ENT_DIR.mkdir(parents=True, exist_ok=True)
 
 PAGE_RE = re.compile(r'^=====\s*PAGE\s+(\d+)\s*=====\s*$', re.MULTILINE)
+# Same boundaries str.splitlines() uses ('\r\n' ends at its '\r').
+LINE_BREAKS = '\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029'
+LINE_BREAK_RE = re.compile('[' + LINE_BREAKS + ']')
 
 ENTITY_PATTERNS = {
     # megacorps / factions
@@ -43,8 +53,43 @@ ENTITY_PATTERNS = {
     'Humanis': r'\bhumanis\b',
 }
 
+# All entity patterns as one alternation so each text is scanned once;
+# group gN maps back to ENTITY_NAMES[N]. Patterns never overlap, so every
+# entity present in a text still produces at least one match. Every pattern
+# starts with \b<letter>; gating the alternation on a word start with one of
+# those letters keeps sre from trying every branch at every position.
+# Patterns are all lowercase and are matched against text lowered once per
+# page, so sre never has to case-fold per character.
+ENTITY_NAMES = list(ENTITY_PATTERNS)
+_FIRST_LETTERS = ''.join(sorted({alt[2] for pat in ENTITY_PATTERNS.values() for alt in pat.split('|')}))
+MASTER_RE = re.compile(
+    rf'\b(?=[{_FIRST_LETTERS}])(?:'
+    + '|'.join(f'(?P<g{i}>{ENTITY_PATTERNS[n]})' for i, n in enumerate(ENTITY_NAMES))
+    + ')'
+)
+NAME_BY_GROUP = {f'g{i}': n for i, n in enumerate(ENTITY_NAMES)}
+ENTITY_RES = {n: re.compile(p) for n, p in ENTITY_PATTERNS.items()}
+
+
+def list_md(root: Path) -> list[str]:
+    # One scandir pass; names only, no per-entry Path objects or glob matching.
+    if not root.is_dir():
+        return []
+    with os.scandir(root) as it:
+        return sorted(e.name for e in it if e.name.endswith('.md') and e.is_file())
+
+
+def list_dirs(root: Path) -> list[str]:
+    if not root.is_dir():
+        return []
+    with os.scandir(root) as it:
+        return sorted(e.name for e in it if e.is_dir())
+
 
 def parse_pages(text: str):
+    # Every page marker contains '=====', so files without one have no pages.
+    if '=====' not in text:
+        return {}
     ms = list(PAGE_RE.finditer(text))
     pages = {}
     for i, m in enumerate(ms):
@@ -55,79 +100,167 @@ def parse_pages(text: str):
     return pages
 
 
-def pick_line(text: str, pat: str):
-    rx = re.compile(pat, re.IGNORECASE)
-    for ln in text.splitlines():
-        s = ln.strip()
-        if s and rx.search(s):
-            return s[:260]
+def line_at(text: str, pos: int) -> str:
+    # The splitlines() line containing pos, without splitting the whole text.
+    start = max(text.rfind(c, 0, pos) for c in LINE_BREAKS) + 1
+    m = LINE_BREAK_RE.search(text, pos)
+    return text[start:m.start() if m else len(text)]
+
+
+def pick_line(text: str, low: str, name: str):
+    # lower() never adds or removes line breaks, so lines pair up one to one;
+    # match on the lowered line, quote the original one.
+    rx = ENTITY_RES[name]
+    for ln, ln_low in zip(text.splitlines(), low.splitlines()):
+        if rx.search(ln_low):
+            s = ln.strip()
+            if s:
+                return s[:260]
     return ''
 
 
-entity_index = {k: [] for k in ENTITY_PATTERNS}
+def scan(text: str, low: str):
+    # (name, snippet) per entity in first-mention order; the snippet is the
+    # line holding the entity's first match, i.e. what pick_line finds. Match
+    # offsets index text only while lower() kept its length, and a match
+    # spanning a line break (saeder\nkrupp) is no line match at all, so
+    # those cases fall back to pick_line.
+    same_len = len(low) == len(text)
+    seen = set()
+    for m in MASTER_RE.finditer(low):
+        name = NAME_BY_GROUP[m.lastgroup]
+        if name in seen:
+            continue
+        seen.add(name)
+        if same_len and not LINE_BREAK_RE.search(low, m.start(), m.end()):
+            yield name, line_at(text, m.start()).strip()[:260]
+        else:
+            yield name, pick_line(text, low, name)
 
-# SR3 corpus (page-cited)
-for book_dir in sorted([p for p in HARM.glob('*') if p.is_dir()]):
+
+# A ref is a plain (source_kind, manual, page, source, snippet) tuple; page is
+# None for wordpress files.
+def scan_book(book_dir: Path):
+    # SR3 corpus (page-cited): (entity, ref) pairs for one book, in page order.
     hfile = book_dir / 'harmonized.md'
     if not hfile.exists():
-        continue
+        return []
+    hits = []
     pages = parse_pages(hfile.read_text(encoding='utf-8', errors='replace'))
+    manual, source = book_dir.name, str(hfile)
     for page_no, page_text in pages.items():
-        lower = page_text.lower()
-        for name, pat in ENTITY_PATTERNS.items():
-            if re.search(pat, lower, flags=re.IGNORECASE):
-                entity_index[name].append({
-                    'source_kind': 'manual',
-                    'manual': book_dir.name,
-                    'page': page_no,
-                    'source': str(hfile),
-                    'snippet': pick_line(page_text, pat) or page_text[:220],
-                })
-
-# Imported wordpress content as general lore source (except Run Notes)
-for folder in ['Homebrew', 'Locations', 'NPCs']:
-    root = WP / folder
-    if not root.exists():
-        continue
-    for md in sorted(root.glob('*.md')):
-        txt = md.read_text(encoding='utf-8', errors='replace')
-        lower = txt.lower()
-        for name, pat in ENTITY_PATTERNS.items():
-            if re.search(pat, lower, flags=re.IGNORECASE):
-                entity_index[name].append({
-                    'source_kind': 'wordpress',
-                    'manual': f'Wordpress/{folder}',
-                    'page': None,
-                    'source': str(md),
-                    'snippet': pick_line(txt, pat) or txt[:220],
-                })
-
-for name, refs in entity_index.items():
-    p = ENT_DIR / f"{name.lower().replace('/', '_')}.md"
-    lines = [f'# Entity: {name}', '', f'- Reference count: **{len(refs)}**', '', '## Cited Mentions', '']
-    if not refs:
-        lines.append('_No cited mentions yet._')
-    for r in refs:
-        if r['page'] is not None:
-            lines.append(f"- **{r['manual']}** p.{r['page']} — {r['snippet']}")
-        else:
-            lines.append(f"- **{r['manual']}** — {r['snippet']}")
-        lines.append(f"  - Source: `{r['source']}`")
-    p.write_text('\n'.join(lines).rstrip() + '\n', encoding='utf-8')
-
-gloss = OUT / 'GLOSSARY.md'
-lines = [
-    '# SR3 General Knowledge Glossary (Cited)',
-    '',
-    'Includes rulebook-derived citations plus imported historical wordpress context where available.',
-    '',
-]
-for name, refs in sorted(entity_index.items(), key=lambda kv: len(kv[1]), reverse=True):
-    slug = name.lower().replace('/', '_')
-    lines.append(f"- **{name}** — {len(refs)} refs (`entities/{slug}.md`)")
-gloss.write_text('\n'.join(lines).rstrip() + '\n', encoding='utf-8')
-
-idx = OUT / 'index.json'
-idx.write_text(json.dumps({k: len(v) for k, v in entity_index.items()}, indent=2), encoding='utf-8')
-print('wrote', idx)
-print('wrote', gloss)
+        for name, snippet in scan(page_text, page_text.lower()):
+            hits.append((name, ('manual', manual, page_no, source, snippet or page_text[:220])))
+    return hits
+
+
+def scan_wordpress(job):
+    folder, md = job
+    txt = md.read_text(encoding='utf-8', errors='replace')
+    manual, source = f'Wordpress/{folder}', str(md)
+    return [
+        (name, ('wordpress', manual, None, source, snippet or txt[:220]))
+        for name, snippet in scan(txt, txt.lower())
+    ]
+
+
+def file_sig(path: str):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+def scan_cache_key() -> str:
+    return f'{SCAN_CACHE_VERSION}:{MASTER_RE.pattern}'
+
+
+def load_scan_cache() -> dict:
+    try:
+        raw = json.loads(SCAN_CACHE.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(raw, dict) or raw.get('key') != scan_cache_key():
+        return {}
+    return raw.get('files') or {}
+
+
+def save_scan_cache(files: dict):
+    SCAN_CACHE.write_text(json.dumps({'key': scan_cache_key(), 'files': files}, ensure_ascii=False), encoding='utf-8')
+
+
+def main(workers: int = 1, rescan: bool = False):
+    entity_index = {k: [] for k in ENTITY_PATTERNS}
+    books = [HARM / name for name in list_dirs(HARM)]
+    # Imported wordpress content as general lore source (except Run Notes)
+    wp_jobs = [(folder, WP / folder / name) for folder in ['Homebrew', 'Locations', 'NPCs'] for name in list_md(WP / folder)]
+
+    keys = [str(b / 'harmonized.md') for b in books] + [str(md) for _, md in wp_jobs]
+    sigs = [file_sig(k) for k in keys]
+    prev = {} if rescan else load_scan_cache()
+    hits_by_key = {}
+    for k, sig in zip(keys, sigs):
+        entry = prev.get(k)
+        if sig and entry and entry.get('sig') == sig:
+            hits_by_key[k] = entry['hits']
+    todo_books = [b for b, k in zip(books, keys) if k not in hits_by_key]
+    todo_wp = [j for j, k in zip(wp_jobs, keys[len(books):]) if k not in hits_by_key]
+
+    # Books and wordpress files are independent; each result is filed under
+    # its path and refs are assembled in input order below, so every entity's
+    # refs come out exactly as in a serial, uncached run.
+    if workers > 1 and len(todo_books) + len(todo_wp) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            book_hits = list(ex.map(scan_book, todo_books))
+            wp_hits = list(ex.map(scan_wordpress, todo_wp, chunksize=8))
+    else:
+        book_hits = [scan_book(b) for b in todo_books]
+        wp_hits = [scan_wordpress(j) for j in todo_wp]
+    for b, hits in zip(todo_books, book_hits):
+        hits_by_key[str(b / 'harmonized.md')] = hits
+    for (_, md), hits in zip(todo_wp, wp_hits):
+        hits_by_key[str(md)] = hits
+
+    for k in keys:
+        for name, ref in hits_by_key[k]:
+            entity_index[name].append(ref)
+    save_scan_cache({k: {'sig': sig, 'hits': hits_by_key[k]} for k, sig in zip(keys, sigs) if sig})
+
+    for name, refs in entity_index.items():
+        p = ENT_DIR / f"{name.lower().replace('/', '_')}.md"
+        lines = [f'# Entity: {name}', '', f'- Reference count: **{len(refs)}**', '', '## Cited Mentions', '']
+        if not refs:
+            lines.append('_No cited mentions yet._')
+        for _, manual, page, source, snippet in refs:
+            if page is not None:
+                lines.append(f"- **{manual}** p.{page} — {snippet}")
+            else:
+                lines.append(f"- **{manual}** — {snippet}")
+            lines.append(f"  - Source: `{source}`")
+        p.write_text('\n'.join(lines).rstrip() + '\n', encoding='utf-8')
+
+    gloss = OUT / 'GLOSSARY.md'
+    lines = [
+        '# SR3 General Knowledge Glossary (Cited)',
+        '',
+        'Includes rulebook-derived citations plus imported historical wordpress context where available.',
+        '',
+    ]
+    for name, refs in sorted(entity_index.items(), key=lambda kv: len(kv[1]), reverse=True):
+        slug = name.lower().replace('/', '_')
+        lines.append(f"- **{name}** — {len(refs)} refs (`entities/{slug}.md`)")
+    gloss.write_text('\n'.join(lines).rstrip() + '\n', encoding='utf-8')
+
+    idx = OUT / 'index.json'
+    idx.write_text(json.dumps({k: len(v) for k, v in entity_index.items()}, indent=2), encoding='utf-8')
+    print('wrote', idx)
+    print('wrote', gloss)
+
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--workers', type=int, default=os.cpu_count(), help='Processes used to scan books and wordpress files.')
+    ap.add_argument('--rescan', action='store_true', help='Ignore the scan cache and rescan every file.')
+    args = ap.parse_args()
+    main(workers=args.workers, rescan=args.rescan)
@@ -2,6 +2,7 @@
 import json
 import re
 import sys
+from collections import Counter
 from pathlib import Path
 
 REPO_ROOT = Path(__file__).resolve().parents[1]
@@ -16,6 +17,7 @@ MEM_TOPICS = P.memory_root / 'topics'
 MEM_TOPICS.mkdir(parents=True, exist_ok=True)
 
 PAGE_RE = re.compile(r'^=====\s*PAGE\s+(\d+)\s*=====\s*$', re.MULTILINE)
+WORD_RE = re.compile(r'\w+')
 
 TOPIC_RULES = {
     'matrix': [r'\bmatrix\b', r'\bdeck\w*\b', r'\bdecker\b', r'\bhost\b', r'\bpersona\b', r'\bic\b', r'\bice\b'],
@@ -25,17 +27,22 @@ TOPIC_RULES = {
     'cyberware_bioware': [r'\bcyber\w*\b', r'\bbioware\b', r'\bessence\b'],
     'gear_equipment': [r'\bweapon\w*\b', r'\bgear\b', r'\bequipment\b', r'\butilit(?:y|ies)\b'],
 }
+TOPIC_RULES_C = {topic: [re.compile(p, re.IGNORECASE) for p in pats] for topic, pats in TOPIC_RULES.items()}
 
 
-def parse_pages(text: str):
-    matches = list(PAGE_RE.finditer(text))
-    pages = {}
-    for i, m in enumerate(matches):
-        p = int(m.group(1))
-        start = m.end()
-        end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
-        pages[p] = text[start:end].strip()
-    return pages
+def page_spans(text: str):
+    # page number -> (start, end) of its body in text; bodies are sliced out
+    # one page at a time by the caller. A repeated page number keeps its
+    # first position and its last body.
+    spans = {}
+    prev = None
+    for m in PAGE_RE.finditer(text):
+        if prev is not None:
+            spans[prev[0]] = (prev[1], m.start())
+        prev = (int(m.group(1)), m.end())
+    if prev is not None:
+        spans[prev[0]] = (prev[1], len(text))
+    return spans
 
 
 def snippets(page_text, max_snips=2):
@@ -49,8 +56,33 @@ def snippets(page_text, max_snips=2):
     return out
 
 
-def count_hits(text, patterns):
-    return sum(len(re.findall(p, text, flags=re.IGNORECASE)) for p in patterns)
+# Every TOPIC_RULES pattern is \b-anchored word characters, so each match is
+# exactly one whole \w+ run of the page. A page is therefore scanned once:
+# its words are counted, and each distinct word is tested against the
+# patterns only the first time it is seen in the corpus.
+_WORD_TOPIC_HITS = {}
+
+
+def word_topic_hits(word):
+    # (topic index, matching pattern count) pairs for one word.
+    hits = _WORD_TOPIC_HITS.get(word)
+    if hits is None:
+        hits = []
+        for i, pats in enumerate(TOPIC_RULES_C.values()):
+            n = sum(1 for p in pats if p.fullmatch(word))
+            if n:
+                hits.append((i, n))
+        hits = _WORD_TOPIC_HITS[word] = tuple(hits)
+    return hits
+
+
+def count_topic_hits(text):
+    # Per-topic hit counts for one page, in TOPIC_RULES order.
+    totals = [0] * len(TOPIC_RULES)
+    for word, n in Counter(WORD_RE.findall(text)).items():
+        for i, hits in word_topic_hits(word):
+            totals[i] += hits * n
+    return totals
 
 
 books = sorted([p for p in HARM.glob('*') if p.is_dir()])
@@ -60,19 +92,24 @@ for book_dir in books:
     hfile = book_dir / 'harmonized.md'
     if not hfile.exists():
         continue
-    pages = parse_pages(hfile.read_text(encoding='utf-8', errors='replace'))
-
-    for page_no, page_text in pages.items():
-        lower = page_text.lower()
-        for topic, pats in TOPIC_RULES.items():
-            hits = count_hits(lower, pats)
+    text = hfile.read_text(encoding='utf-8', errors='replace')
+    book, source = book_dir.name, str(hfile)
+
+    for page_no, (start, end) in page_spans(text).items():
+        page_text = text[start:end].strip()
+        # Page-derived values are computed once and shared by every topic
+        # that cites the page.
+        page_snips = None
+        for topic, hits in zip(TOPIC_RULES, count_topic_hits(page_text.lower())):
             if hits > 0:
+                if page_snips is None:
+                    page_snips = snippets(page_text)
                 index[topic].append({
-                    'book': book_dir.name,
-                    'source': str(hfile),
+                    'book': book,
+                    'source': source,
                     'page': page_no,
                     'hits': hits,
-                    'snippets': snippets(page_text),
+                    'snippets': page_snips,
                 })
 
 # scoring
@@ -1,9 +1,14 @@
 #!/usr/bin/env python3
 import difflib
 import json
+import os
 import re
 import sys
 import time
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from itertools import accumulate
 from pathlib import Path
 
 REPO_ROOT = Path(__file__).resolve().parents[1]
@@ -12,6 +17,27 @@ if str(REPO_ROOT) not in sys.path:
 
 from config.pipeline_paths import get_paths
 
+try:
+    import orjson
+except ImportError:  # optional speedup; stdlib json is the fallback
+    orjson = None
+
+json_loads = orjson.loads if orjson else json.loads
+
+
+def json_line_bytes(obj) -> bytes:
+    # One JSONL row, UTF-8, non-ASCII kept as is.
+    if orjson:
+        return orjson.dumps(obj, option=orjson.OPT_APPEND_NEWLINE)
+    return (json.dumps(obj, ensure_ascii=False) + '\n').encode('utf-8')
+
+
+def json_dump_bytes(obj) -> bytes:
+    # Same layout as json.dumps(indent=2, ensure_ascii=False) plus a newline.
+    if orjson:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE)
+    return (json.dumps(obj, indent=2, ensure_ascii=False) + '\n').encode('utf-8')
+
 P = get_paths()
 QUEUE = P.memory_root / 'entity_request_queue.jsonl'
 CAMP = P.memory_root / 'campaign'
@@ -24,17 +50,59 @@ REQ_ENT.mkdir(parents=True, exist_ok=True)
 GAME_LOGS = P.raw_root / 'Game_Logs'
 HARM = P.outputs_root / 'harmonized_all'
 PAGE_RE = re.compile(r'^=====\s*PAGE\s+(\d+)\s*=====\s*$', re.MULTILINE)
+SLUG_RE = re.compile(r'[^a-z0-9-]+')
+SLUG_TRANS = str.maketrans({'/': '-', ' ': '-'})
+WS_RE = re.compile(r'\s+')
+# Same boundaries str.splitlines() uses ('\r\n' ends at its '\r').
+LINE_BREAKS = '\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029'
+LINE_BREAK_RE = re.compile('[' + LINE_BREAKS + ']')
+# Game logs are read together so a cold page cache overlaps per-file latency.
+READ_WORKERS = 8
 
 
 def slugify(name: str) -> str:
-    return re.sub(r'[^a-z0-9-]+', '-', name.lower().replace('/', '-').replace(' ', '-')).strip('-')
+    return SLUG_RE.sub('-', name.lower().translate(SLUG_TRANS)).strip('-')
 
 
+@lru_cache(maxsize=None)
 def normalize(name: str) -> str:
-    return re.sub(r'\s+', ' ', (name or '').strip()).casefold()
+    return WS_RE.sub(' ', (name or '').strip()).casefold()
+
+
+def list_md(root: Path) -> list[str]:
+    # One scandir pass; names only, no per-entry Path objects or glob matching.
+    if not root.is_dir():
+        return []
+    with os.scandir(root) as it:
+        return sorted(e.name for e in it if e.name.endswith('.md') and e.is_file())
+
+
+def list_dirs(root: Path) -> list[str]:
+    if not root.is_dir():
+        return []
+    with os.scandir(root) as it:
+        return sorted(e.name for e in it if e.is_dir())
+
+
+def read_all(paths: list[Path]) -> dict[Path, str]:
+    if len(paths) < 2:
+        return {p: p.read_text(encoding='utf-8', errors='replace') for p in paths}
+    with ThreadPoolExecutor(max_workers=READ_WORKERS) as ex:
+        texts = ex.map(lambda p: p.read_text(encoding='utf-8', errors='replace'), paths)
+        return dict(zip(paths, texts))
+
+
+def line_at(text: str, pos: int) -> str:
+    # The splitlines() line containing pos, without splitting the whole text.
+    start = max(text.rfind(c, 0, pos) for c in LINE_BREAKS) + 1
+    m = LINE_BREAK_RE.search(text, pos)
+    return text[start:m.start() if m else len(text)]
 
 
 def parse_pages(text: str):
+    # Every page marker contains '=====', so files without one have no pages.
+    if '=====' not in text:
+        return {}
     ms = list(PAGE_RE.finditer(text))
     out = {}
     for i, m in enumerate(ms):
@@ -45,6 +113,38 @@ def parse_pages(text: str):
     return out
 
 
+# find_mentions runs once per queue row; parse each harmonized book once per
+# run (keyed on mtime/size so an edited file is re-read) and keep the lowered
+# book and page text alongside for the literal prefilter.
+@lru_cache(maxsize=64)
+def _harmonized_pages(path: str, mtime_ns: int, size: int):
+    text = Path(path).read_text(encoding='utf-8', errors='replace')
+    return text.lower(), [(pno, txt, txt.lower()) for pno, txt in parse_pages(text).items()]
+
+
+def harmonized_pages(md: Path):
+    st = md.stat()
+    return _harmonized_pages(str(md), st.st_mtime_ns, st.st_size)
+
+
+# Game logs are likewise scanned for every queue row. Keep each file's text,
+# lowered copy and line-start offsets for the run, so the line bookkeeping is
+# done once per file instead of once per row.
+_game_log_cache = {}
+
+
+def game_logs():
+    keys = {}
+    for name in list_md(GAME_LOGS):
+        f = GAME_LOGS / name
+        st = f.stat()
+        keys[f] = (str(f), st.st_mtime_ns, st.st_size)
+    for f, text in read_all([f for f, key in keys.items() if key not in _game_log_cache]).items():
+        lines = text.splitlines(keepends=True)
+        _game_log_cache[keys[f]] = (text, text.lower(), lines, list(accumulate(map(len, lines), initial=0)))
+    return [(f, *_game_log_cache[key]) for f, key in keys.items()]
+
+
 def load_queue():
     rows = []
     if not QUEUE.exists():
@@ -52,18 +152,24 @@ def load_queue():
     for line in QUEUE.read_text(encoding='utf-8', errors='replace').splitlines():
         if not line.strip():
             continue
-        rows.append(json.loads(line))
+        rows.append(json_loads(line))
     return rows
 
 
 def save_queue(rows):
-    QUEUE.write_text('\n'.join(json.dumps(r, ensure_ascii=False) for r in rows) + ('\n' if rows else ''), encoding='utf-8')
+    # Stream rows into a sibling temp file and swap it in, so a crash mid-write
+    # never leaves a truncated queue behind.
+    tmp = QUEUE.with_name(QUEUE.name + '.tmp')
+    with tmp.open('wb', buffering=1 << 20) as f:
+        for r in rows:
+            f.write(json_line_bytes(r))
+    os.replace(tmp, QUEUE)
 
 
 def load_catalog():
     if not CATALOG.exists():
         return []
-    raw = json.loads(CATALOG.read_text(encoding='utf-8'))
+    raw = json_loads(CATALOG.read_bytes())
     rows = raw.get('entities', []) if isinstance(raw, dict) else raw
     out = []
     for r in rows:
@@ -80,62 +186,98 @@ def load_catalog():
 
 def save_catalog(rows):
     CATALOG.parent.mkdir(parents=True, exist_ok=True)
-    CATALOG.write_text(json.dumps(rows, indent=2, ensure_ascii=False) + '\n', encoding='utf-8')
+    CATALOG.write_bytes(json_dump_bytes(rows))
 
 
-def append_audit_event(submission_id: str, payload: dict):
+def append_audit_event(audit: list, submission_id: str, payload: dict):
     if not submission_id:
         return
+    audit.append(json_line_bytes({'submission_id': submission_id, **payload}))
+
+
+def flush_audit(audit: list):
+    # One open/append for the whole run instead of one per event.
+    if not audit:
+        return
     AUDIT.parent.mkdir(parents=True, exist_ok=True)
-    row = {'submission_id': submission_id, **payload}
-    with AUDIT.open('a', encoding='utf-8') as f:
-        f.write(json.dumps(row, ensure_ascii=False) + '\n')
+    with AUDIT.open('ab', buffering=1 << 20) as f:
+        f.writelines(audit)
 
 
-def resolve_canonical(entity: str, catalog):
-    target = normalize(entity)
+def index_catalog(catalog):
+    # normalized canonical/synonym -> row; the first row claiming a name wins,
+    # as with a front-to-back scan of the catalog.
+    index = {}
     for row in catalog:
-        if normalize(row['canonical']) == target:
-            return row
-        for syn in row.get('synonyms', []):
-            if normalize(syn) == target:
-                return row
-    return None
+        index_catalog_row(index, row)
+    return index
+
+
+def index_catalog_row(index, row):
+    for name in [row['canonical'], *row.get('synonyms', [])]:
+        index.setdefault(normalize(name), row)
+
+
+# Queue rows resolving to the same catalog entry share one compiled pattern.
+@lru_cache(maxsize=4096)
+def terms_re(terms: tuple):
+    # One alternation for all synonyms: a single search per line instead of one per term.
+    # Each branch keeps the \b...\b anchoring it had as a standalone pattern.
+    return re.compile(r'\b(?:' + '|'.join(re.escape(t) for t in terms) + r')\b', re.IGNORECASE)
 
 
 def find_mentions(terms, max_hits=120):
-    pats = [re.compile(r'\b' + re.escape(t) + r'\b', re.IGNORECASE) for t in terms if t]
+    terms = tuple(t for t in terms if t)
     hits = []
+    if not terms:
+        return hits
+    rx = terms_re(terms)
+    # A regex hit implies the term occurs as a plain substring of the lowered
+    # text, so cheap `in` checks rule out most files and pages first.
+    literals = {t.lower() for t in terms}
     seen = set()
 
-    def line_hit(text):
-        return any(p.search(text) for p in pats)
+    def has_literal(text, low=None):
+        low = text.lower() if low is None else low
+        return any(lit in low for lit in literals)
 
-    for f in sorted(GAME_LOGS.glob('*.md')):
-        lines = f.read_text(encoding='utf-8', errors='replace').splitlines()
-        for i, ln in enumerate(lines, start=1):
-            if line_hit(ln):
-                rec = {
-                    'domain': 'campaign',
-                    'source': f'{f}#L{i}',
-                    'excerpt': ln.strip()[:280],
-                }
-                key = (rec['domain'], rec['source'], rec['excerpt'])
-                if key in seen:
-                    continue
-                seen.add(key)
-                hits.append(rec)
-                if len(hits) >= max_hits:
-                    return hits
-
-    for h in sorted([p for p in HARM.glob('*') if p.is_dir()]):
+    for f, text, low, lines, starts in game_logs():
+        if not has_literal(text, low):
+            continue
+        # Scan the whole file once and map matches back to lines, so lines
+        # without a term never reach Python. Terms cannot span a line break.
+        last = 0
+        for m in rx.finditer(text):
+            i = bisect_right(starts, m.start())
+            if i == last:
+                continue
+            last = i
+            rec = {
+                'domain': 'campaign',
+                'source': f'{f}#L{i}',
+                'excerpt': lines[i - 1].strip()[:280],
+            }
+            key = (rec['domain'], rec['source'], rec['excerpt'])
+            if key in seen:
+                continue
+            seen.add(key)
+            hits.append(rec)
+            if len(hits) >= max_hits:
+                return hits
+
+    for h in (HARM / name for name in list_dirs(HARM)):
         md = h / 'harmonized.md'
         if not md.exists():
             continue
-        pages = parse_pages(md.read_text(encoding='utf-8', errors='replace'))
-        for pno, txt in pages.items():
-            if line_hit(txt):
-                line = next((x.strip() for x in txt.splitlines() if line_hit(x)), txt.strip().splitlines()[0] if txt.strip() else '')
+        book_low, pages = harmonized_pages(md)
+        # One substring test rules out a book with no term anywhere.
+        if not has_literal(book_low, book_low):
+            continue
+        for pno, txt, low in pages:
+            m = rx.search(txt) if has_literal(txt, low) else None
+            if m:
+                # Terms never span a line break, so the first matching line is the one holding the first match.
+                line = line_at(txt, m.start()).strip()
                 rec = {
                     'domain': 'general',
                     'source': f'{md}#PAGE-{pno}',
@@ -165,6 +307,8 @@ def _append_history(r, event, detail=''):
 def main():
     rows = load_queue()
     catalog = load_catalog()
+    catalog_index = index_catalog(catalog)
+    audit = []
     catalog_changed = False
     queue_changed = False
     processed = 0
@@ -207,7 +351,7 @@ def main():
         ]
         submission_id = (r.get('source_submission_id') or '').strip()
 
-        match = resolve_canonical(entity, catalog)
+        match = catalog_index.get(normalize(entity))
         if match:
             canonical = match['canonical']
             terms = [canonical] + match.get('synonyms', [])
@@ -217,6 +361,7 @@ def main():
             catalog.append({'canonical': canonical, 'type': 'Unknown', 'synonyms': []})
             catalog_changed = True
             match = catalog[-1]
+            index_catalog_row(catalog_index, match)
             action_log.append('catalog entry created')
 
         mentions = find_mentions(terms)
@@ -234,7 +379,7 @@ def main():
             r['resolved_entity'] = canonical
             r['output'] = str(canonical_article)
             _append_history(r, 'completed', 'already present in canonical campaign entities (integrated)')
-            append_audit_event(submission_id, {
+            append_audit_event(audit, submission_id, {
                 'ts': int(time.time()),
                 'status': 'completed',
                 'result': 'integrated',
@@ -284,7 +429,7 @@ def main():
         r['resolved_entity'] = canonical
         r['output'] = str(out)
         _append_history(r, 'completed', f'research dossier written ({len(mentions)} mentions)')
-        append_audit_event(submission_id, {
+        append_audit_event(audit, submission_id, {
             'ts': int(time.time()),
             'status': 'completed',
             'result': 'researched',
@@ -301,6 +446,7 @@ def main():
         queue_changed = True
         processed += 1
 
+    flush_audit(audit)
     if queue_changed:
         save_queue(rows)
     if catalog_changed:
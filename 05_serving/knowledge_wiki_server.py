@@ -3,15 +3,19 @@ from __future__ import annotations
 
 import argparse
 import hashlib
+import hmac
 import html
+import io
 import json
 import os
 import re
 import secrets
 import subprocess
 import sys
+import threading
 import time
 import uuid
+from collections import Counter
 from dataclasses import dataclass
 from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
@@ -41,12 +45,22 @@ PLAYER_INPUT_FILE = MEMORY_ROOT / 'player_input' / 'submissions.jsonl'
 PLAYER_AUDIT_FILE = MEMORY_ROOT / 'player_input' / 'request_audit.jsonl'
 DEBUG_SOURCE_ROOTS = [MEMORY_ROOT, P.raw_root, P.cleaned_root, P.data_root]
 WIKI_PASSWORD = os.environ.get('WIKI_PASSWORD', 'neilbreen')
+WIKI_PASSWORD_HASH = hashlib.sha256(WIKI_PASSWORD.encode()).digest()
 SESSION_COOKIE = 'cindywiki_session'
 SESSION_TTL_SEC = 60 * 60 * 24 * 7
 SESSIONS: dict[str, int] = {}
-
-
-@dataclass
+SESSION_SWEEP_SEC = 300
+_SESSIONS_LOCK = threading.Lock()
+_SESSION_SWEEP = {'last': 0}
+PROFILE_FILES = [WS / 'CHARACTER_PROFILE.md', WS / 'IDENTITY.md', WS / 'SOUL.md', WS / 'TOOLS.md', WS / 'USER.md']
+# Every tree build_articles() reads from; any file added, removed or edited
+# under them invalidates the cached articles.
+ARTICLE_ROOTS = [CONSOLIDATED_ROOT, MEMORY_ROOT / 'lore', MEMORY_ROOT / 'campaign', MEMORY_ROOT / 'topics']
+# How long in-place edits to existing article files can go unnoticed.
+ARTICLES_RECHECK_SEC = 5
+
+
+@dataclass(slots=True)
 class Article:
     slug: str
     title: str
@@ -67,18 +81,22 @@ def heading_title(text: str, fallback: str) -> str:
     return fallback
 
 
+def _iter_jsonl(path: Path):
+    # One parsed object per non-blank line, read a line at a time; bad lines are skipped.
+    if not path.exists():
+        return
+    with path.open('r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except Exception:
+                continue
+
+
 def read_queue():
-    if not QUEUE_FILE.exists():
-        return []
-    rows = []
-    for line in QUEUE_FILE.read_text(encoding='utf-8', errors='replace').splitlines():
-        if not line.strip():
-            continue
-        try:
-            rows.append(json.loads(line))
-        except Exception:
-            continue
-    return rows
+    return list(_iter_jsonl(QUEUE_FILE))
 
 
 def append_queue(entity: str, note: str = '', source_submission_id: str = '', submitter: str = ''):
@@ -102,31 +120,11 @@ def append_queue(entity: str, note: str = '', source_submission_id: str = '', su
 
 
 def read_player_input():
-    if not PLAYER_INPUT_FILE.exists():
-        return []
-    rows = []
-    for line in PLAYER_INPUT_FILE.read_text(encoding='utf-8', errors='replace').splitlines():
-        if not line.strip():
-            continue
-        try:
-            rows.append(json.loads(line))
-        except Exception:
-            continue
-    return rows
+    return list(_iter_jsonl(PLAYER_INPUT_FILE))
 
 
 def read_player_audit():
-    if not PLAYER_AUDIT_FILE.exists():
-        return []
-    rows = []
-    for line in PLAYER_AUDIT_FILE.read_text(encoding='utf-8', errors='replace').splitlines():
-        if not line.strip():
-            continue
-        try:
-            rows.append(json.loads(line))
-        except Exception:
-            continue
-    return rows
+    return list(_iter_jsonl(PLAYER_AUDIT_FILE))
 
 
 def safe_source_path(path_value: str | None) -> Path | None:
@@ -235,26 +233,36 @@ def trigger_rebuild(target: str = '', scope: str = 'entity'):
     return proc.returncode == 0
 
 
+_CAMPAIGN_PREFIXES = ('Campaign NPC: ', 'Campaign PC: ', 'Campaign Entity: ')
+_CHOICES_CACHE = [None, []]  # (articles, choices), swapped as one value
+
+
+def entity_name_of(title: str) -> str:
+    for prefix in _CAMPAIGN_PREFIXES:
+        title = title.removeprefix(prefix)
+    return title.strip()
+
+
 def list_entity_choices(articles: dict[str, Article]):
-    names = []
-    for slug, a in articles.items():
-        if slug.startswith('campaign-entities-'):
-            names.append(a.title.replace('Campaign NPC: ', '').replace('Campaign PC: ', '').replace('Campaign Entity: ', '').strip())
-    return sorted(set(n for n in names if n))
+    # Recomputed only for a new article set (see get_articles()).
+    cached_for, choices = _CHOICES_CACHE
+    if cached_for is not articles:
+        names = {entity_name_of(a.title) for slug, a in articles.items() if slug.startswith('campaign-entities-')}
+        names.discard('')
+        choices = sorted(names)
+        _CHOICES_CACHE[:] = [articles, choices]
+    return choices
+
+
+_MANIFEST_CACHE = {'sig': None, 'rows': []}
 
 
 def load_manifest_rows():
-    rows = []
-    if not MANIFEST_PATH.exists():
-        return rows
-    for line in MANIFEST_PATH.read_text(encoding='utf-8', errors='replace').splitlines():
-        if not line.strip():
-            continue
-        try:
-            rows.append(json.loads(line))
-        except Exception:
-            continue
-    return rows
+    # Parsed once per manifest version (mtime/size); callers only read the rows.
+    sig = _stat_sig(MANIFEST_PATH)
+    if sig != _MANIFEST_CACHE['sig']:
+        _MANIFEST_CACHE.update(sig=sig, rows=list(_iter_jsonl(MANIFEST_PATH)))
+    return _MANIFEST_CACHE['rows']
 
 
 def norm_entity_key(name: str) -> str:
@@ -264,11 +272,40 @@ def norm_entity_key(name: str) -> str:
     return s
 
 
+def _scan_md(root: Path) -> list[Path]:
+    # root.glob('*.md') without fnmatch: one scandir, suffix check on the name.
+    with os.scandir(root) as it:
+        return [Path(e.path) for e in it if e.name.endswith('.md') and e.is_file()]
+
+
+def _walk_md(root: str, out: list[str]):
+    with os.scandir(root) as it:
+        for e in it:
+            if e.is_dir(follow_symlinks=False):
+                _walk_md(e.path, out)
+            elif e.name.endswith('.md') and e.is_file():
+                out.append(e.path)
+
+
+def _iter_md(root: Path) -> list[Path]:
+    # sorted(root.rglob('*.md')) via scandir: names come straight from the
+    # directory listing, and Paths are built once per markdown file. Sorting
+    # by path components matches how Path objects order.
+    found: list[str] = []
+    _walk_md(str(root), found)
+    found.sort(key=lambda x: x.split(os.sep))
+    return [Path(x) for x in found]
+
+
 def aggregate_entity_markdown(md_paths: list[Path]) -> str:
     parts = []
+    # Manifest md_files arrive sorted already, so the sort is a single timsort
+    # pass. Read and skip on failure instead of a separate exists() stat per file.
     for mp in sorted(md_paths, key=lambda x: x.name.lower()):
-        if mp.exists():
+        try:
             parts.append(load_markdown(mp).strip())
+        except OSError:
+            continue
     return '\n\n'.join(p for p in parts if p).strip()
 
 
@@ -276,7 +313,7 @@ def build_articles() -> dict[str, Article]:
     articles: dict[str, Article] = {}
 
     cindy_parts = []
-    for p in [WS / 'CHARACTER_PROFILE.md', WS / 'IDENTITY.md', WS / 'SOUL.md', WS / 'TOOLS.md', WS / 'USER.md']:
+    for p in PROFILE_FILES:
         if p.exists():
             cindy_parts.append(f"## {p.name}\n\n" + load_markdown(p))
     cindy_body = '\n\n'.join(cindy_parts).strip() or '# Cindy Lou Jenkins\n\nNo profile found yet.'
@@ -323,7 +360,7 @@ def build_articles() -> dict[str, Article]:
             if not root.exists():
                 continue
             groups = {}
-            for md in root.glob('*.md'):
+            for md in _scan_md(root):
                 base = md.stem.split('.', 1)[0]
                 groups.setdefault(base, []).append(md)
             for base, md_paths in groups.items():
@@ -340,7 +377,7 @@ def build_articles() -> dict[str, Article]:
     ]:
         if not root.exists():
             continue
-        for md in sorted(root.rglob('*.md')):
+        for md in _iter_md(root):
             # Avoid duplicating request docs and nested entity duplicates handled elsewhere
             if 'requests' in md.parts:
                 continue
@@ -373,7 +410,7 @@ def build_articles() -> dict[str, Article]:
     ]:
         if not root.exists():
             continue
-        for md in sorted(root.rglob('*.md')):
+        for md in _iter_md(root):
             rel = md.relative_to(root)
             slug = f"{slug_prefix}-" + '-'.join(rel.with_suffix('').parts).lower().replace('_', '-')
             text_md = load_markdown(md)
@@ -382,7 +419,7 @@ def build_articles() -> dict[str, Article]:
 
     requests_root = MEMORY_ROOT / 'campaign' / 'requests'
     if requests_root.exists():
-        for md in sorted(requests_root.glob('*.md')):
+        for md in sorted(_scan_md(requests_root)):
             slug = 'campaign-requests-' + md.stem.replace('_', '-').lower()
             text_md = load_markdown(md)
             title = heading_title(text_md, md.stem.replace('_', ' ').title())
@@ -412,9 +449,10 @@ def compile_linker(articles: dict[str, Article]):
 
         for line in a.body.splitlines():
             s = line.strip()
-            if not s.lower().startswith('- synonyms:'):
+            # Lowercase only the 11-character prefix, not the whole line.
+            if s[:11].lower() != '- synonyms:':
                 continue
-            raw = s.split(':', 1)[1].strip()
+            raw = s[11:].strip()
             if not raw or raw.lower() == '_none_':
                 continue
             for alias in [x.strip() for x in raw.split(',')]:
@@ -430,10 +468,114 @@ def compile_linker(articles: dict[str, Article]):
     names = sorted(name_to_slug.keys(), key=len, reverse=True)
     if not names:
         return None, name_to_slug
-    pattern = re.compile(r'(?<![\w/])(' + '|'.join(re.escape(n) for n in names) + r')(?![\w/])')
+    # Group 1 matches a whole HTML tag so autolink_html can pass it through in
+    # the same sub() pass; group 2 is a linkable name in text between tags.
+    # The lookahead on the names' first characters lets sre reject most
+    # positions with one class test instead of trying every alternative.
+    first_chars = ''.join(sorted({re.escape(n[0]) for n in names}))
+    pattern = re.compile(
+        r'(<[^>]+>)|(?<![\w/])(?=[' + first_chars + r'])('
+        + '|'.join(re.escape(n) for n in names)
+        + r')(?![\w/])'
+    )
     return pattern, name_to_slug
 
 
+def _sweep_sessions(now: int):
+    # Drop abandoned expired tokens every few minutes; caller holds _SESSIONS_LOCK.
+    if now - _SESSION_SWEEP['last'] < SESSION_SWEEP_SEC:
+        return
+    _SESSION_SWEEP['last'] = now
+    for token in [t for t, exp in SESSIONS.items() if exp < now]:
+        del SESSIONS[token]
+
+
+def _stat_sig(path) -> tuple:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return (str(path), None, None)
+    return (str(path), st.st_mtime_ns, st.st_size)
+
+
+def articles_stamp(extra_paths, dirs: list | None = None) -> tuple:
+    # Stats only, no reads: profile docs, manifest-listed files (which may live
+    # outside ARTICLE_ROOTS) and every file under the article roots. Walked
+    # directories are collected into dirs for articles_dir_stamp().
+    sig = [_stat_sig(p) for p in PROFILE_FILES]
+    sig.extend(_stat_sig(p) for p in extra_paths)
+    for root in ARTICLE_ROOTS:
+        if dirs is not None:
+            dirs.append(root)
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames.sort()
+            if dirs is not None and dirpath != str(root):
+                dirs.append(dirpath)
+            sig.extend(_stat_sig(os.path.join(dirpath, name)) for name in sorted(filenames))
+    if dirs is not None:
+        dirs.extend(sorted({os.path.dirname(str(p)) for p in extra_paths}))
+    return tuple(sig)
+
+
+def articles_dir_stamp(dirs, extra_paths) -> tuple:
+    # Cheap per-request check: directory mtimes catch files added, removed or
+    # replaced by rename; the manifest and profile docs are statted directly.
+    # In-place edits elsewhere wait for the next full articles_stamp().
+    sig = [_stat_sig(p) for p in PROFILE_FILES]
+    sig.append(_stat_sig(MANIFEST_PATH))
+    sig.extend(_stat_sig(d) for d in dirs)
+    return tuple(sig)
+
+
+_ARTICLES_LOCK = threading.Lock()
+_ARTICLES_CACHE = {'stamp': None, 'extra': (), 'articles': None, 'linker': None, 'linker_version': 0,
+                   'dirs': [], 'dir_stamp': None, 'checked': 0.0}
+# slug -> [body, body sha1, linker_version, autolinked html, outbound refs,
+#          html with source citations linked (filled on first page view),
+#          markdown html before autolinking]
+_HTML_CACHE: dict[str, list] = {}
+
+
+def get_articles():
+    # Articles and the linker are rebuilt only when a source file changed;
+    # ThreadingHTTPServer handlers share the result read-only.
+    with _ARTICLES_LOCK:
+        now = time.monotonic()
+        # The full walk stats every file, so between walks only directory
+        # mtimes and the manifest/profile files are checked on each request.
+        if (
+            _ARTICLES_CACHE['articles'] is not None
+            and now - _ARTICLES_CACHE['checked'] < ARTICLES_RECHECK_SEC
+            and articles_dir_stamp(_ARTICLES_CACHE['dirs'], _ARTICLES_CACHE['extra']) == _ARTICLES_CACHE['dir_stamp']
+        ):
+            pattern, name_to_slug = _ARTICLES_CACHE['linker']
+            return _ARTICLES_CACHE['articles'], pattern, name_to_slug, _ARTICLES_CACHE['linker_version']
+        dirs = []
+        stamp = articles_stamp(_ARTICLES_CACHE['extra'], dirs)
+        extra = _ARTICLES_CACHE['extra']
+        if stamp != _ARTICLES_CACHE['stamp']:
+            articles = build_articles()
+            extra = tuple(sorted({str(x) for row in load_manifest_rows() for x in row.get('md_files', []) if str(x).strip()}))
+            if extra != _ARTICLES_CACHE['extra']:
+                dirs = []
+                stamp = articles_stamp(extra, dirs)
+            linker = compile_linker(articles)
+            old = _ARTICLES_CACHE['linker']
+            # Only a different linker invalidates rendered HTML; an edit that
+            # leaves titles and synonyms alone keeps the other articles cached.
+            if old is None or old[1] != linker[1] or getattr(old[0], 'pattern', None) != getattr(linker[0], 'pattern', None):
+                _ARTICLES_CACHE['linker_version'] += 1
+            _ARTICLES_CACHE.update(stamp=stamp, extra=extra, articles=articles, linker=linker)
+            # Drop rendered HTML for articles that no longer exist, so the
+            # render cache stays bounded by the current corpus.
+            for slug in list(_HTML_CACHE):
+                if slug not in articles:
+                    _HTML_CACHE.pop(slug, None)
+        _ARTICLES_CACHE.update(dirs=dirs, dir_stamp=articles_dir_stamp(dirs, extra), checked=now)
+        pattern, name_to_slug = _ARTICLES_CACHE['linker']
+        return _ARTICLES_CACHE['articles'], pattern, name_to_slug, _ARTICLES_CACHE['linker_version']
+
+
 def markdown_to_html(md_text: str) -> str:
     return markdown.markdown(
         md_text,
@@ -454,19 +596,80 @@ def autolink_html(html_text: str, current_slug: str, pattern, name_to_slug):
     refs = set()
 
     def repl(m):
-        name = m.group(1)
+        tag, name = m.groups()
+        if tag:
+            return tag
         target = name_to_slug.get(name)
         if not target or target == current_slug:
             return name
         refs.add(target)
         return f'<a href="/article/{quote(target)}">{html.escape(name)}</a>'
 
-    chunks = re.split(r'(<[^>]+>)', html_text)
-    for i, c in enumerate(chunks):
-        if c.startswith('<') and c.endswith('>'):
-            continue
-        chunks[i] = pattern.sub(repl, c)
-    return ''.join(chunks), refs
+    return pattern.sub(repl, html_text), refs
+
+
+def _html_entry(slug: str, body: str, pattern, name_to_slug, linker_version: int) -> list:
+    # Markdown + autolink output for one article, reused while neither its
+    # body nor the linker changed. The same body object (no rebuild since)
+    # skips even the hash. Markdown output depends only on the body, so a new
+    # linker re-runs just the autolink pass over the stored HTML.
+    hit = _HTML_CACHE.get(slug)
+    plain_html = None
+    if hit and hit[0] is body:
+        digest = hit[1]
+    else:
+        digest = hashlib.sha1(body.encode('utf-8')).digest()
+    if hit and hit[1] == digest:
+        hit[0] = body
+        if hit[2] == linker_version:
+            return hit
+        plain_html = hit[6]
+    if plain_html is None:
+        plain_html = markdown_to_html(body)
+    linked_html, refs = autolink_html(plain_html, slug, pattern, name_to_slug)
+    entry = [body, digest, linker_version, linked_html, frozenset(refs), None, plain_html]
+    _HTML_CACHE[slug] = entry
+    return entry
+
+
+def render_linked(slug: str, body: str, pattern, name_to_slug, linker_version: int):
+    entry = _html_entry(slug, body, pattern, name_to_slug, linker_version)
+    return entry[3], entry[4]
+
+
+def render_article_html(slug: str, body: str, pattern, name_to_slug, linker_version: int):
+    # Fully linked article HTML (names + source citations) and its outbound refs.
+    entry = _html_entry(slug, body, pattern, name_to_slug, linker_version)
+    if entry[5] is None:
+        entry[5] = link_source_citations(entry[3])
+    return entry[5], entry[4]
+
+
+_GRAPH_LOCK = threading.Lock()
+_GRAPH_CACHE = {'articles': None, 'graph': None}
+
+
+def get_link_graph(articles: dict[str, Article], pattern, name_to_slug, linker_version: int):
+    # Inbound reference counts/sources, rebuilt only for a new article set
+    # (get_articles() returns the same dict, and linker, until something changed).
+    with _GRAPH_LOCK:
+        if _GRAPH_CACHE['articles'] is articles:
+            return _GRAPH_CACHE['graph']
+        outgoing = {}
+        for slug, a in articles.items():
+            if slug in {'index', 'entity-queue'}:
+                continue
+            _, outgoing[slug] = render_linked(slug, a.body, pattern, name_to_slug, linker_version)
+
+        inbound_count = {slug: 0 for slug in articles}
+        inbound_sources = {slug: [] for slug in articles}
+        for src, tgts in outgoing.items():
+            for t in tgts:
+                if t in inbound_count:
+                    inbound_count[t] += 1
+                    inbound_sources[t].append(src)
+        _GRAPH_CACHE.update(articles=articles, graph=(inbound_count, inbound_sources))
+        return _GRAPH_CACHE['graph']
 
 
 def link_source_citations(html_text: str) -> str:
@@ -498,77 +701,99 @@ def link_source_citations(html_text: str) -> str:
     return code_re.sub(repl, html_text)
 
 
+# Static login page, split around the error message and next-path fields.
+_LOGIN_HEAD = """<!doctype html><html><head><meta charset=\"utf-8\" /><title>Cindy Wiki Login</title>
+<style>body { font-family: -apple-system, system-ui, sans-serif; max-width: 460px; margin: 4rem auto; padding: 0 1rem; }
+.card { border:1px solid #ddd; border-radius:10px; padding:1rem; } input { width:100%; padding:.55rem; margin:.4rem 0 .8rem 0; } button { padding:.5rem .8rem; }</style>
+</head><body><div class='card'><h2>Cindy Knowledge Wiki</h2><p>Password required.</p>"""
+_LOGIN_MID = """
+<form method='POST' action='/login'><input type='hidden' name='next' value='"""
+_LOGIN_TAIL = """' /><input type='password' name='password' placeholder='Password' autofocus required />
+<button type='submit'>Unlock</button></form></div></body></html>"""
+
+
 def render_login(error: str = '', next_path: str = '/'):
     err = f"<p style='color:#b00020'>{html.escape(error)}</p>" if error else ''
     if not next_path or not str(next_path).startswith('/'):
         next_path = '/'
-    return f"""<!doctype html><html><head><meta charset=\"utf-8\" /><title>Cindy Wiki Login</title>
-<style>body {{ font-family: -apple-system, system-ui, sans-serif; max-width: 460px; margin: 4rem auto; padding: 0 1rem; }}
-.card {{ border:1px solid #ddd; border-radius:10px; padding:1rem; }} input {{ width:100%; padding:.55rem; margin:.4rem 0 .8rem 0; }} button {{ padding:.5rem .8rem; }}</style>
-</head><body><div class='card'><h2>Cindy Knowledge Wiki</h2><p>Password required.</p>{err}
-<form method='POST' action='/login'><input type='hidden' name='next' value='{html.escape(next_path)}' /><input type='password' name='password' placeholder='Password' autofocus required />
-<button type='submit'>Unlock</button></form></div></body></html>"""
+    return _LOGIN_HEAD + err + _LOGIN_MID + html.escape(next_path) + _LOGIN_TAIL
 
 
-def render_page(title: str, body_html: str):
-    return f"""<!doctype html><html><head><meta charset=\"utf-8\" />
-<title>{html.escape(title)} - Cindy Knowledge Wiki</title>
+# Static page chrome, split around the two per-request fields.
+_PAGE_HEAD = """<!doctype html><html><head><meta charset=\"utf-8\" />
+<title>"""
+_PAGE_MID = """ - Cindy Knowledge Wiki</title>
 <style>
-body {{ font-family: -apple-system, system-ui, sans-serif; max-width: 1040px; margin: 2rem auto; padding: 0 1rem; line-height: 1.45; }}
-a {{ color:#0b57d0; text-decoration:none; }} a:hover {{ text-decoration:underline; }}
-.header {{ display:flex; justify-content:space-between; gap:1rem; align-items:center; margin-bottom:1rem; }}
-.nav a {{ margin-right:.8rem; }} .card {{ border:1px solid #ddd; border-radius:10px; padding:.9rem 1rem; margin:.7rem 0; }}
-.meta {{ color:#555; font-size:.93rem; margin-bottom:.7rem; }}
-code {{ background:#f5f5f5; padding:0 .2rem; border-radius:4px; }}
-pre {{ background:#f6f8fa; color:#1f2328; padding:.8rem; border-radius:8px; overflow:auto; border:1px solid #d0d7de; }}
-.mermaid {{ background:#fff; border:1px solid #ddd; border-radius:8px; padding:.75rem; overflow:auto; }}
-input, textarea {{ width:100%; padding:.5rem; margin:.25rem 0 .6rem 0; }}
-button {{ padding:.5rem .75rem; }}
+body { font-family: -apple-system, system-ui, sans-serif; max-width: 1040px; margin: 2rem auto; padding: 0 1rem; line-height: 1.45; }
+a { color:#0b57d0; text-decoration:none; } a:hover { text-decoration:underline; }
+.header { display:flex; justify-content:space-between; gap:1rem; align-items:center; margin-bottom:1rem; }
+.nav a { margin-right:.8rem; } .card { border:1px solid #ddd; border-radius:10px; padding:.9rem 1rem; margin:.7rem 0; }
+.meta { color:#555; font-size:.93rem; margin-bottom:.7rem; }
+code { background:#f5f5f5; padding:0 .2rem; border-radius:4px; }
+pre { background:#f6f8fa; color:#1f2328; padding:.8rem; border-radius:8px; overflow:auto; border:1px solid #d0d7de; }
+.mermaid { background:#fff; border:1px solid #ddd; border-radius:8px; padding:.75rem; overflow:auto; }
+input, textarea { width:100%; padding:.5rem; margin:.25rem 0 .6rem 0; }
+button { padding:.5rem .75rem; }
 </style>
 <script src="https://cdn.jsdelivr.net/npm/mermaid@10/dist/mermaid.min.js"></script>
 </head><body>
 <div class=\"header\"><div><strong>Cindy Lou Jenkins — Knowledge Wiki</strong></div>
 <div class=\"nav\"><a href=\"/\">Front Page</a><a href=\"/article/index\">Index</a><a href=\"/article/campaign-timeline\">Campaign Timeline</a><a href=\"/article/data-sources\">Data Sources</a><a href=\"/article/data-diagnostics\">Data Diagnostics</a><a href=\"/article/entity-queue\">Entity Queue</a></div></div>
-{body_html}
+"""
+_PAGE_TAIL = """
 <script>
-(() => {{
+(() => {
   const blocks = document.querySelectorAll('pre > code.language-mermaid, pre > code.lang-mermaid');
   if (!blocks.length) return;
-  blocks.forEach((codeEl) => {{
+  blocks.forEach((codeEl) => {
     const pre = codeEl.parentElement;
     const div = document.createElement('div');
     div.className = 'mermaid';
     div.textContent = codeEl.textContent || '';
     pre.replaceWith(div);
-  }});
-  if (window.mermaid) {{
-    mermaid.initialize({{ startOnLoad: false, securityLevel: 'loose', theme: 'default' }});
-    mermaid.run({{ querySelector: '.mermaid' }});
-  }}
-}})();
+  });
+  if (window.mermaid) {
+    mermaid.initialize({ startOnLoad: false, securityLevel: 'loose', theme: 'default' });
+    mermaid.run({ querySelector: '.mermaid' });
+  }
+})();
 </script>
 </body></html>"""
 
 
+def render_page(title: str, body_html: str):
+    return _PAGE_HEAD + html.escape(title) + _PAGE_MID + body_html + _PAGE_TAIL
+
+
 class WikiHandler(BaseHTTPRequestHandler):
+    # Buffer wfile so the status line, headers and a page body go out in one
+    # write; StreamRequestHandler flushes it when each request is done.
+    wbufsize = 64 * 1024
+    # HTTP/1.1 keeps the connection open between requests, so a browsing
+    # session reuses one socket; every response must carry Content-Length.
+    protocol_version = 'HTTP/1.1'
+
     def get_session_token(self):
         raw = self.headers.get('Cookie', '')
         for part in raw.split(';'):
-            p = part.strip()
-            if p.startswith(SESSION_COOKIE + '='):
-                return p.split('=', 1)[1]
+            name, sep, value = part.strip().partition('=')
+            if sep and name == SESSION_COOKIE:
+                return value
         return None
 
     def is_authenticated(self):
         token = self.get_session_token()
         if not token:
             return False
-        exp = SESSIONS.get(token)
-        if not exp:
-            return False
-        if exp < int(time.time()):
-            SESSIONS.pop(token, None)
-            return False
+        now = int(time.time())
+        with _SESSIONS_LOCK:
+            _sweep_sessions(now)
+            exp = SESSIONS.get(token)
+            if not exp:
+                return False
+            if exp < now:
+                SESSIONS.pop(token, None)
+                return False
         return True
 
     def require_auth_or_login(self):
@@ -588,13 +813,11 @@ class WikiHandler(BaseHTTPRequestHandler):
             next_path = (form.get('next', ['/'])[0] or '/')
             if not next_path.startswith('/'):
                 next_path = '/'
-            if hashlib.sha256(pw.encode()).hexdigest() == hashlib.sha256(WIKI_PASSWORD.encode()).hexdigest():
+            if hmac.compare_digest(hashlib.sha256(pw.encode()).digest(), WIKI_PASSWORD_HASH):
                 token = secrets.token_urlsafe(24)
-                SESSIONS[token] = int(time.time()) + SESSION_TTL_SEC
-                self.send_response(303)
-                self.send_header('Set-Cookie', f"{SESSION_COOKIE}={token}; Path=/; HttpOnly; SameSite=Lax")
-                self.send_header('Location', next_path)
-                self.end_headers()
+                with _SESSIONS_LOCK:
+                    SESSIONS[token] = int(time.time()) + SESSION_TTL_SEC
+                self.redirect(next_path, cookie=f"{SESSION_COOKIE}={token}; Path=/; HttpOnly; SameSite=Lax")
             else:
                 self.respond_html(render_login('Invalid password.', next_path=next_path))
             return
@@ -608,9 +831,7 @@ class WikiHandler(BaseHTTPRequestHandler):
             note = (form.get('note', [''])[0] or '').strip()
             if entity:
                 append_queue(entity, note)
-            self.send_response(303)
-            self.send_header('Location', '/article/entity-queue')
-            self.end_headers()
+            self.redirect('/article/entity-queue')
             return
 
         if parsed.path == '/player-input-add':
@@ -624,9 +845,7 @@ class WikiHandler(BaseHTTPRequestHandler):
                 if request_type in {'research', 'update', 'question'}:
                     append_queue(entity, f"[{player or 'Unknown Player'}] {note}", source_submission_id=submission_id, submitter=(player or 'Unknown Player'))
             redirect = f"/article/{target_slug}" if target_slug else '/article/entity-queue'
-            self.send_response(303)
-            self.send_header('Location', redirect)
-            self.end_headers()
+            self.redirect(redirect)
             return
 
         if parsed.path == '/rebuild-entity':
@@ -636,9 +855,7 @@ class WikiHandler(BaseHTTPRequestHandler):
             redirect = f"/article/{slug}" if slug else '/'
             if ok:
                 redirect += ('&' if '?' in redirect else '?') + 'rebuilt=1'
-            self.send_response(303)
-            self.send_header('Location', redirect)
-            self.end_headers()
+            self.redirect(redirect)
             return
 
         self.send_error(404, 'Not found')
@@ -655,84 +872,76 @@ class WikiHandler(BaseHTTPRequestHandler):
         if not self.require_auth_or_login():
             return
 
-        articles = build_articles()
-        pattern, name_to_slug = compile_linker(articles)
-
-        outgoing = {}
-        for slug, a in articles.items():
-            if slug in {'index', 'entity-queue'}:
-                continue
-            raw_html = markdown_to_html(a.body)
-            _, refs = autolink_html(raw_html, slug, pattern, name_to_slug)
-            outgoing[slug] = refs
-
-        inbound_count = {slug: 0 for slug in articles}
-        inbound_sources = {slug: [] for slug in articles}
-        for src, tgts in outgoing.items():
-            for t in tgts:
-                if t in inbound_count:
-                    inbound_count[t] += 1
-                    inbound_sources[t].append(src)
-
-        if path == '/':
-            home_slug = 'campaign-entities-cindy-lou-jenkins' if 'campaign-entities-cindy-lou-jenkins' in articles else 'cindy-lou-jenkins'
-            self.serve_article(articles, inbound_count, inbound_sources, pattern, name_to_slug, home_slug)
-            return
-        if path == '/article/index':
-            self.serve_index(articles, inbound_count)
-            return
+        # Pages that never touch the article set.
         if path == '/article/campaign-timeline':
             self.serve_campaign_timeline()
             return
         if path == '/article/data-sources':
             self.serve_data_sources()
             return
-        if path == '/article/data-diagnostics':
-            self.serve_data_diagnostics(articles)
-            return
         if path == '/debug/source':
             self.serve_source_debug(parsed)
             return
+
+        articles, pattern, name_to_slug, linker_version = get_articles()
+
+        if path == '/article/data-diagnostics':
+            self.serve_data_diagnostics(articles)
+            return
         if path == '/article/entity-queue':
-            self.serve_queue(articles, inbound_count, pattern, name_to_slug)
+            self.serve_queue(articles)
+            return
+
+        # Only the index and article pages show reference counts.
+        inbound_count, inbound_sources = get_link_graph(articles, pattern, name_to_slug, linker_version)
+        if path == '/':
+            home_slug = 'campaign-entities-cindy-lou-jenkins' if 'campaign-entities-cindy-lou-jenkins' in articles else 'cindy-lou-jenkins'
+            self.serve_article(articles, inbound_count, inbound_sources, pattern, name_to_slug, linker_version, home_slug)
+            return
+        if path == '/article/index':
+            self.serve_index(articles, inbound_count)
             return
         if path.startswith('/article/'):
-            self.serve_article(articles, inbound_count, inbound_sources, pattern, name_to_slug, path[len('/article/'):])
+            self.serve_article(articles, inbound_count, inbound_sources, pattern, name_to_slug, linker_version, path[len('/article/'):])
             return
 
         self.send_error(404, 'Not found')
 
     def serve_index(self, articles, inbound_count):
-        cards = ['<h1>Index</h1>', '<p>Every article in the knowledgebase.</p>']
+        buf = io.StringIO()
+        w = buf.write
+        w('<h1>Index</h1>\n<p>Every article in the knowledgebase.</p>')
         cats = {}
         for slug, a in articles.items():
             cats.setdefault(a.category, []).append((slug, a))
         for cat in ['core', 'general', 'campaign', 'campaign-queue']:
             if cat not in cats:
                 continue
-            cards.append(f'<h2>{html.escape(cat.replace('-', ' ').title())}</h2><div class="card"><ul>')
+            w(f'\n<h2>{html.escape(cat.replace('-', ' ').title())}</h2><div class="card"><ul>')
             for slug, a in sorted(cats[cat], key=lambda x: x[1].title.lower()):
                 if slug == 'cindy-lou-jenkins' and 'campaign-entities-cindy-lou-jenkins' in articles:
                     continue
-                cards.append(
-                    f'<li><a href="/article/{quote(slug)}">{html.escape(a.title)}</a> '
+                w(
+                    f'\n<li><a href="/article/{quote(slug)}">{html.escape(a.title)}</a> '
                     f'<span class="meta">(referenced by {inbound_count.get(slug,0)} items)</span></li>'
                 )
-            cards.append('</ul></div>')
-        self.respond_html(render_page('Index', '\n'.join(cards)))
+            w('\n</ul></div>')
+        self.respond_html(render_page('Index', buf.getvalue()))
 
-    def serve_queue(self, articles, inbound_count, pattern, name_to_slug):
+    def serve_queue(self, articles):
         rows = read_queue()
         choices = list_entity_choices(articles)
         options = ''.join(f"<option value='{html.escape(c)}'>{html.escape(c)}</option>" for c in choices)
-        body = [
-            '<h1>Entity Request Queue</h1>',
-            '<p>Request a new named entity, or submit additional facts/requests for an existing one.</p>',
+        buf = io.StringIO()
+        w = buf.write
+        w(
+            '<h1>Entity Request Queue</h1>\n'
+            '<p>Request a new named entity, or submit additional facts/requests for an existing one.</p>\n'
             '<div class="card"><form method="POST" action="/queue-add">'
             '<label>Entity name (new or existing)</label><input name="entity" list="entities" placeholder="e.g., Otaku or Harac" required />'
             f"<datalist id='entities'>{options}</datalist>"
             '<label>Note (optional)</label><textarea name="note" rows="3" placeholder="Why this matters"></textarea>'
-            '<button type="submit">Add to queue</button></form></div>',
+            '<button type="submit">Add to queue</button></form></div>\n'
             '<div class="card"><h3>Player Input</h3>'
             '<form method="POST" action="/player-input-add">'
             '<input type="hidden" name="target_slug" value="entity-queue" />'
@@ -740,17 +949,17 @@ class WikiHandler(BaseHTTPRequestHandler):
             '<label>Entity</label><input name="entity" list="entities" placeholder="Existing entity or new one" required />'
             '<label>Request type</label><select name="request_type"><option value="fact">Fact</option><option value="update">Update</option><option value="research">Research request</option><option value="question">Question</option></select>'
             '<label>Submission</label><textarea name="note" rows="4" placeholder="Add facts, corrections, or requests"></textarea>'
-            '<button type="submit">Submit player input</button></form></div>',
+            '<button type="submit">Submit player input</button></form></div>\n'
             '<h2>Queued entities</h2><div class="card"><ul>'
-        ]
+        )
         for r in sorted(rows, key=lambda x: x.get('ts', 0), reverse=True):
             ts = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(r.get('ts', 0)))
-            body.append(f"<li><strong>{html.escape(r.get('entity',''))}</strong> <span class='meta'>[{html.escape(r.get('status','pending'))}] {ts}</span>")
+            w(f"\n<li><strong>{html.escape(r.get('entity',''))}</strong> <span class='meta'>[{html.escape(r.get('status','pending'))}] {ts}</span>")
             if r.get('note'):
-                body.append(f"<div class='meta'>{html.escape(r.get('note'))}</div>")
-            body.append('</li>')
-        body.append('</ul></div>')
-        self.respond_html(render_page('Entity Queue', '\n'.join(body)))
+                w(f"\n<div class='meta'>{html.escape(r.get('note'))}</div>")
+            w('\n</li>')
+        w('\n</ul></div>')
+        self.respond_html(render_page('Entity Queue', buf.getvalue()))
 
     def serve_campaign_timeline(self):
         if CAMPAIGN_TIMELINE_PATH.exists():
@@ -854,22 +1063,11 @@ class WikiHandler(BaseHTTPRequestHandler):
         self.respond_html(render_page('Data Sources', ''.join(body)))
 
     def serve_data_diagnostics(self, articles):
-        manifest_count = 0
-        campaign_manifest = 0
-        general_manifest = 0
-        if MANIFEST_PATH.exists():
-            for line in MANIFEST_PATH.read_text(encoding='utf-8', errors='replace').splitlines():
-                if not line.strip():
-                    continue
-                try:
-                    row = json.loads(line)
-                except Exception:
-                    continue
-                manifest_count += 1
-                if str(row.get('scope', '')).lower() == 'campaign':
-                    campaign_manifest += 1
-                elif str(row.get('scope', '')).lower() == 'general':
-                    general_manifest += 1
+        manifest_rows = load_manifest_rows()
+        scopes = Counter(str(row.get('scope', '')).lower() for row in manifest_rows)
+        manifest_count = len(manifest_rows)
+        campaign_manifest = scopes['campaign']
+        general_manifest = scopes['general']
 
         queue_rows = read_queue()
         player_rows = read_player_input()
@@ -878,37 +1076,39 @@ class WikiHandler(BaseHTTPRequestHandler):
         for a in articles.values():
             by_cat[a.category] = by_cat.get(a.category, 0) + 1
 
-        cards = [
-            '<h1>Data Diagnostics</h1>',
-            '<p>Coverage snapshot of loaded wiki data, manifest state, and incoming suggestion queues.</p>',
-            '<p><a href="/article/data-sources">Open full Data Sources browser →</a></p>',
+        buf = io.StringIO()
+        w = buf.write
+        w(
+            '<h1>Data Diagnostics</h1>'
+            '<p>Coverage snapshot of loaded wiki data, manifest state, and incoming suggestion queues.</p>'
+            '<p><a href="/article/data-sources">Open full Data Sources browser →</a></p>'
             '<div class="card"><h3>Loaded Articles</h3><ul>'
-        ]
+        )
         for k in sorted(by_cat):
-            cards.append(f'<li><strong>{html.escape(k)}</strong>: {by_cat[k]}</li>')
-        cards.append(f'<li><strong>Total</strong>: {len(articles)}</li>')
-        cards.append('</ul></div>')
-
-        cards.append('<div class="card"><h3>Manifest Coverage</h3><ul>')
-        cards.append(f'<li>Manifest path: <code>{html.escape(str(MANIFEST_PATH))}</code></li>')
-        cards.append(f'<li>Rows: {manifest_count}</li>')
-        cards.append(f'<li>Campaign entities: {campaign_manifest}</li>')
-        cards.append(f'<li>General entities: {general_manifest}</li>')
-        cards.append('</ul></div>')
-
-        cards.append('<div class="card"><h3>Incoming Suggestions</h3><ul>')
-        cards.append(f'<li>Entity request queue items: {len(queue_rows)}</li>')
-        cards.append(f'<li>Player submissions: {len(player_rows)}</li>')
+            w(f'<li><strong>{html.escape(k)}</strong>: {by_cat[k]}</li>')
+        w(f'<li><strong>Total</strong>: {len(articles)}</li>')
+        w('</ul></div>')
+
+        w('<div class="card"><h3>Manifest Coverage</h3><ul>')
+        w(f'<li>Manifest path: <code>{html.escape(str(MANIFEST_PATH))}</code></li>')
+        w(f'<li>Rows: {manifest_count}</li>')
+        w(f'<li>Campaign entities: {campaign_manifest}</li>')
+        w(f'<li>General entities: {general_manifest}</li>')
+        w('</ul></div>')
+
+        w('<div class="card"><h3>Incoming Suggestions</h3><ul>')
+        w(f'<li>Entity request queue items: {len(queue_rows)}</li>')
+        w(f'<li>Player submissions: {len(player_rows)}</li>')
         if queue_rows:
             latest_q = sorted(queue_rows, key=lambda x: x.get('ts', 0), reverse=True)[:5]
-            cards.append('<li>Latest queue entries:<ul>')
+            w('<li>Latest queue entries:<ul>')
             for r in latest_q:
                 ts = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(r.get('ts', 0)))
-                cards.append(f"<li>{html.escape(r.get('entity',''))} — <span class='meta'>{ts}</span></li>")
-            cards.append('</ul></li>')
-        cards.append('</ul></div>')
+                w(f"<li>{html.escape(r.get('entity',''))} — <span class='meta'>{ts}</span></li>")
+            w('</ul></li>')
+        w('</ul></div>')
 
-        self.respond_html(render_page('Data Diagnostics', ''.join(cards)))
+        self.respond_html(render_page('Data Diagnostics', buf.getvalue()))
 
     def serve_source_debug(self, parsed):
         q = parse_qs(parsed.query)
@@ -975,15 +1175,13 @@ class WikiHandler(BaseHTTPRequestHandler):
         )
         self.respond_html(render_page('Source Debug', body))
 
-    def serve_article(self, articles, inbound_count, inbound_sources, pattern, name_to_slug, slug):
+    def serve_article(self, articles, inbound_count, inbound_sources, pattern, name_to_slug, linker_version, slug):
         a = articles.get(slug)
         if not a:
             self.send_error(404, 'Article not found')
             return
-        raw_html = markdown_to_html(a.body)
-        linked_html, refs = autolink_html(raw_html, slug, pattern, name_to_slug)
-        linked_html = link_source_citations(linked_html)
-        entity_name = a.title.replace('Campaign NPC: ', '').replace('Campaign PC: ', '').replace('Campaign Entity: ', '').strip()
+        linked_html, refs = render_article_html(slug, a.body, pattern, name_to_slug, linker_version)
+        entity_name = entity_name_of(a.title)
         rebuild_form = ''
         if slug.startswith('campaign-entities-') or slug == 'cindy-lou-jenkins':
             rebuild_form = (
@@ -1031,13 +1229,36 @@ class WikiHandler(BaseHTTPRequestHandler):
             backlink_block.append('</ul>')
         backlink_block.append('</div>')
 
-        self.respond_html(render_page(a.title, input_form + meta + linked_html + ''.join(backlink_block)))
+        self.respond_html(render_page(a.title, input_form + meta + linked_html + ''.join(backlink_block)), etag=True)
 
-    def respond_html(self, body: str):
+    def redirect(self, location: str, cookie: str | None = None):
+        self.send_response(303)
+        if cookie:
+            self.send_header('Set-Cookie', cookie)
+        self.send_header('Location', location)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def respond_html(self, body: str, etag: bool = False):
         data = body.encode('utf-8')
+        tag = None
+        if etag:
+            # Browsers revalidate with If-None-Match; an unchanged page costs
+            # only the headers.
+            tag = '"' + hashlib.blake2b(data, digest_size=16).hexdigest() + '"'
+            sent = self.headers.get('If-None-Match', '')
+            if sent and (sent.strip() == '*' or tag in (t.strip().removeprefix('W/') for t in sent.split(','))):
+                self.send_response(304)
+                self.send_header('ETag', tag)
+                self.send_header('Cache-Control', 'private, no-cache')
+                self.end_headers()
+                return
         self.send_response(200)
         self.send_header('Content-Type', 'text/html; charset=utf-8')
         self.send_header('Content-Length', str(len(data)))
+        if tag:
+            self.send_header('ETag', tag)
+            self.send_header('Cache-Control', 'private, no-cache')
         self.end_headers()
         self.wfile.write(data)
 
@@ -6,26 +6,32 @@ import json
 from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
 from urllib.parse import urlparse
+import signal
 import sys
+import threading
 
-REPO_ROOT = Path(__file__).resolve().parents[1]
-if str(REPO_ROOT) not in sys.path:
-    sys.path.insert(0, str(REPO_ROOT))
+try:
+    import orjson
+except ImportError:  # optional speedup; stdlib json is the fallback
+    orjson = None
+
+json_loads = orjson.loads if orjson else json.loads
 
-import importlib.util
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SERVING_DIR = REPO_ROOT / "05_serving"
+for _p in (REPO_ROOT, SERVING_DIR):
+    if str(_p) not in sys.path:
+        sys.path.insert(0, str(_p))
 
-_bridge_path = Path(__file__).resolve().parent / "memory_bridge.py"
-_spec = importlib.util.spec_from_file_location("memory_bridge", _bridge_path)
-if _spec is None or _spec.loader is None:
-    raise RuntimeError(f"Unable to load memory bridge module: {_bridge_path}")
-_mod = importlib.util.module_from_spec(_spec)
-sys.modules[_spec.name] = _mod
-_spec.loader.exec_module(_mod)
+import memory_bridge as _mod
 
 
 class Handler(BaseHTTPRequestHandler):
     def _json(self, code: int, payload: dict):
-        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        if orjson:
+            data = orjson.dumps(payload)
+        else:
+            data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
         self.send_response(code)
         self.send_header("Content-Type", "application/json; charset=utf-8")
         self.send_header("Content-Length", str(len(data)))
@@ -35,7 +41,7 @@ class Handler(BaseHTTPRequestHandler):
     def _read_json(self) -> dict:
         n = int(self.headers.get("Content-Length", "0"))
         raw = self.rfile.read(n).decode("utf-8", errors="replace") if n else "{}"
-        return json.loads(raw or "{}")
+        return json_loads(raw or "{}")
 
     def do_GET(self):
         parsed = urlparse(self.path)
@@ -100,8 +106,22 @@ def main():
     ap.add_argument("--port", type=int, default=8091)
     args = ap.parse_args()
     server = ThreadingHTTPServer(("0.0.0.0", args.port), Handler)
+    # Let in-flight requests finish on shutdown so their rows get queued.
+    server.daemon_threads = False
+
+    def _on_sigterm(signum, frame):
+        # restart() stops the API with SIGTERM. shutdown() blocks until
+        # serve_forever() returns, so it cannot run on this (the main) thread.
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, _on_sigterm)
     print(f"Memory API listening on http://127.0.0.1:{args.port}")
-    server.serve_forever()
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        # upsert_fact/queue_entity answer before their rows are written.
+        _mod.flush_writes()
 
 
 if __name__ == "__main__":
@@ -1,22 +1,99 @@
 #!/usr/bin/env python3
 from __future__ import annotations
 
+import atexit
+import heapq
 import json
+import mmap
+import multiprocessing
+import os
+import queue
 import re
+import signal
 import subprocess
+import sys
+import threading
 import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Iterable
 
 from config.pipeline_paths import get_paths
 
+try:
+    import ahocorasick
+except ImportError:  # optional speedup; per-term str.count is the fallback
+    ahocorasick = None
+
+try:
+    import orjson
+except ImportError:  # optional speedup; stdlib json is the fallback
+    orjson = None
+
+# faiss, numpy and sentence_transformers are optional and imported by
+# _semantic_model() on first semantic search, so importing this module (as the
+# keyword index workers do) does not pull in torch.
+faiss = None
+np = None
+
+json_loads = orjson.loads if orjson else json.loads
+
+
+def json_line_bytes(obj) -> bytes:
+    # One JSONL row, UTF-8, non-ASCII kept as is.
+    if orjson:
+        return orjson.dumps(obj, option=orjson.OPT_APPEND_NEWLINE)
+    return (json.dumps(obj, ensure_ascii=False) + "\n").encode("utf-8")
+
+
 P = get_paths()
 REPO_ROOT = Path(P.repo_root)
 MEMORY_ROOT = Path(P.memory_root)
 AUDIT_DIR = P.data_root / "logs"
 AUDIT_FILE = AUDIT_DIR / "memory_upserts.jsonl"
 FACTS_FILE = MEMORY_ROOT / "99_runtime" / "chat_facts.jsonl"
+INDEX_FILE = P.cache_root / "keyword_index.json"
+INDEX_VERSION = 1
+TOKEN_RE = re.compile(r"\w+")
+TERM_CACHE_SIZE = 4096
+# Re-tokenize this many changed documents or more across worker processes.
+INDEX_PARALLEL_MIN = 200
+INDEX_WORKERS = os.cpu_count() or 1
+# Bytes that rule out searching a file in place: non-ASCII (str.lower() is
+# not bytewise there) and \r (text mode rewrites newlines, moving offsets).
+NOT_PLAIN_RE = re.compile(rb"[\x80-\xff\r]")
+# Count this many punctuated terms or more in one Aho-Corasick pass per text.
+AC_MIN_TERMS = 3
+# JSONL appends are batched: up to LOG_BATCH_MAX rows, or whatever arrives
+# within LOG_BATCH_SEC of the first one.
+LOG_BATCH_MAX = 256
+LOG_BATCH_SEC = 0.02
+SEMANTIC_DIR = P.cache_root / "semantic_index"
+SEMANTIC_VERSION = 3
+SEMANTIC_MODEL = os.environ.get("SEMANTIC_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+# Words per embedded chunk; all-MiniLM-L6-v2 truncates input at 256 word pieces.
+SEMANTIC_CHUNK_WORDS = 180
+# Cosine similarity a chunk needs to count as a semantic hit.
+SEMANTIC_MIN_SCORE = 0.40
+# Vectors sampled to train the int8 quantizer.
+SEMANTIC_TRAIN_MAX = 65536
+# Chunk count from which an HNSW graph replaces the exhaustive scan.
+SEMANTIC_HNSW_MIN = 10000
+SEMANTIC_HNSW_M = 32
+SEMANTIC_HNSW_EF_CONSTRUCTION = 200
+SEMANTIC_HNSW_EF_SEARCH = 64
+# Share of dead (superseded) rows at which the index is compacted.
+SEMANTIC_COMPACT_DEAD = 0.25
+# Recent queries keep their embedding and, for SEMANTIC_RESULT_TTL seconds
+# while the index is unchanged, their hits. A new query whose embedding has
+# at least SEMANTIC_DUP_SCORE cosine with a cached one reuses its hits.
+SEMANTIC_CACHE_SIZE = 512
+SEMANTIC_RESULT_TTL = 300.0
+SEMANTIC_DUP_SCORE = 0.95
+# How long restart() waits for a stopped service to release its port.
+STOP_TIMEOUT_SEC = 5.0
 
 
 @dataclass
@@ -29,7 +106,42 @@ class SearchHit:
     page: str | None = None
 
 
-def _iter_docs(scope: str = "all") -> Iterable[Path]:
+# roots -> (mtime of every directory walked, document paths)
+_DOC_CACHE: dict[tuple[str, ...], tuple[list[tuple[str, int | None]], list[str]]] = {}
+
+
+def _dir_mtime(path: str) -> int | None:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _walk_docs(root: str, docs: list[str], dirs: list[tuple[str, int | None]]) -> None:
+    # Pre-order: a directory's markdown files, then its subdirectories.
+    # The mtime is taken before listing, so a change made during the walk
+    # still invalidates the result.
+    dirs.append((root, _dir_mtime(root)))
+    try:
+        with os.scandir(root) as it:
+            entries = list(it)
+    except OSError:
+        return
+    subdirs = []
+    for e in entries:
+        try:
+            is_dir = e.is_dir(follow_symlinks=False)
+        except OSError:
+            is_dir = False
+        if is_dir:
+            subdirs.append(e.path)
+        elif e.name.endswith(".md"):
+            docs.append(e.path)
+    for sub in subdirs:
+        _walk_docs(sub, docs, dirs)
+
+
+def _iter_docs(scope: str = "all") -> list[str]:
     if not MEMORY_ROOT.exists():
         return []
     roots: list[Path] = []
@@ -42,16 +154,28 @@ def _iter_docs(scope: str = "all") -> Iterable[Path]:
         roots.append(MEMORY_ROOT / "00_sources" / "rules_references")
     roots.append(MEMORY_ROOT / "90_derived")
 
+    # Adding, removing or renaming an entry changes its directory's mtime, so
+    # the cached list stays valid while every walked directory is unchanged;
+    # checking that is one stat per directory instead of a full listing.
+    key = tuple(str(r) for r in roots)
+    cached = _DOC_CACHE.get(key)
+    if cached is not None and all(_dir_mtime(d) == m for d, m in cached[0]):
+        return cached[1]
+
+    dirs: list[tuple[str, int | None]] = []
+    found: list[str] = []
+    for root in key:
+        _walk_docs(root, found, dirs)
+    docs = []
     seen = set()
-    for root in roots:
-        if not root.exists():
+    for path in found:
+        rp = os.path.realpath(path)
+        if rp in seen:
             continue
-        for p in root.rglob("*.md"):
-            rp = str(p.resolve())
-            if rp in seen:
-                continue
-            seen.add(rp)
-            yield p
+        seen.add(rp)
+        docs.append(path)
+    _DOC_CACHE[key] = (dirs, docs)
+    return docs
 
 
 def _doc_id(p: Path) -> str:
@@ -70,46 +194,710 @@ def _snippet(text: str, idx: int, span: int = 220) -> str:
     return text[start:end].replace("\n", " ").strip()
 
 
+# Inverted index over the lowercased markdown, persisted to INDEX_FILE and
+# refreshed per document by (mtime_ns, size). Tokens are maximal \w runs,
+# so a search term made only of word characters can never span two tokens:
+# its substring count in a document is sum(tf * token.count(term)) over the
+# tokens containing it, and no file has to be read to score it.
+_INDEX_LOCK = threading.Lock()
+# path -> [mtime_ns, size, {token: [tf, first_offset]}]
+_INDEX_DOCS: dict[str, list] | None = None
+# token -> {path: (tf, first_offset)}
+_POSTINGS: dict[str, dict[str, tuple[int, int]]] = {}
+# word term -> _word_term_hits(term); emptied whenever the index changes
+_TERM_HITS: dict[str, dict[str, list[int]]] = {}
+
+
+def _read_doc(path: str) -> str | None:
+    try:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            return f.read()
+    except Exception:
+        return None
+
+
+def _open_doc(path: str) -> str | mmap.mmap | None:
+    # A read-only map for plain ASCII files, whose byte offsets are text
+    # offsets and whose bytes lowercase like the decoded text; the decoded
+    # text otherwise. Callers close the map.
+    try:
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                if not NOT_PLAIN_RE.search(mm):
+                    return mm
+                mm.close()
+    except (OSError, ValueError):
+        return None
+    return _read_doc(path)
+
+
+def _view_snippet(view: str | mmap.mmap, idx: int, span: int = 220) -> str:
+    # _snippet() that decodes only the snippet window of a mapped file.
+    if isinstance(view, str):
+        return _snippet(view, idx, span)
+    if idx < 0:
+        return _snippet(view[:span].decode("ascii"), -1, span)
+    start = max(0, idx - span // 3)
+    return _snippet(view[start:idx + span].decode("ascii"), idx - start, span)
+
+
+def _tokenize(low: str) -> dict[str, list[int]]:
+    toks: dict[str, list[int]] = {}
+    for m in TOKEN_RE.finditer(low):
+        tok = m.group()
+        entry = toks.get(tok)
+        if entry is None:
+            toks[tok] = [1, m.start()]
+        else:
+            entry[0] += 1
+    return toks
+
+
+def _index_doc(path: str) -> dict[str, list[int]] | None:
+    text = _read_doc(path)
+    return None if text is None else _tokenize(text.lower())
+
+
+def _post(path: str, toks: dict[str, list[int]]) -> None:
+    for tok, (tf, first) in toks.items():
+        _POSTINGS.setdefault(tok, {})[path] = (tf, first)
+
+
+def _unpost(path: str, toks: dict[str, list[int]]) -> None:
+    for tok in toks:
+        posting = _POSTINGS.get(tok)
+        if posting is not None:
+            posting.pop(path, None)
+            if not posting:
+                del _POSTINGS[tok]
+
+
+def _load_index() -> None:
+    global _INDEX_DOCS
+    _INDEX_DOCS = {}
+    try:
+        data = json_loads(INDEX_FILE.read_bytes())
+    except (OSError, ValueError):
+        return
+    if not isinstance(data, dict) or data.get("version") != INDEX_VERSION:
+        return
+    _INDEX_DOCS = data.get("docs") or {}
+    for path, (_, _, toks) in _INDEX_DOCS.items():
+        _post(path, toks)
+
+
+def _save_index() -> None:
+    for path in [p for p in _INDEX_DOCS if not os.path.exists(p)]:
+        _unpost(path, _INDEX_DOCS.pop(path)[2])
+    try:
+        INDEX_FILE.parent.mkdir(parents=True, exist_ok=True)
+        tmp = INDEX_FILE.with_name(INDEX_FILE.name + ".tmp")
+        tmp.write_bytes(json_line_bytes({"version": INDEX_VERSION, "docs": _INDEX_DOCS}))
+        os.replace(tmp, INDEX_FILE)
+    except OSError:
+        pass  # read-only cache dir: keep the in-memory index only
+
+
+def _sync_index(paths: list[str]) -> None:
+    # Re-tokenize only documents whose (mtime_ns, size) changed.
+    if _INDEX_DOCS is None:
+        _load_index()
+    dirty = False
+    todo: list[tuple[str, os.stat_result]] = []
+    for path in paths:
+        entry = _INDEX_DOCS.get(path)
+        try:
+            st = os.stat(path)
+        except OSError:
+            st = None
+        if entry is not None and st is not None and entry[0] == st.st_mtime_ns and entry[1] == st.st_size:
+            continue
+        if entry is not None:
+            _unpost(path, entry[2])
+            del _INDEX_DOCS[path]
+            dirty = True
+        if st is not None:
+            todo.append((path, st))
+
+    todo_paths = [path for path, _ in todo]
+    if len(todo) >= INDEX_PARALLEL_MIN and INDEX_WORKERS > 1:
+        # A cold or largely stale index: tokenize across processes. Spawn, not
+        # fork: this runs under _INDEX_LOCK in threaded hosts (the API server,
+        # the log writer), and forking those can deadlock; macOS defaults to
+        # spawn anyway. Workers import this module and run _index_doc. A host
+        # script without a __main__ guard breaks the pool (its workers re-run
+        # it), so tokenize here instead of failing the search.
+        ctx = multiprocessing.get_context("spawn")
+        try:
+            with ProcessPoolExecutor(max_workers=INDEX_WORKERS, mp_context=ctx) as ex:
+                results = list(ex.map(_index_doc, todo_paths, chunksize=max(1, len(todo) // (INDEX_WORKERS * 4))))
+        except (BrokenProcessPool, RuntimeError, OSError):
+            results = map(_index_doc, todo_paths)
+    else:
+        results = map(_index_doc, todo_paths)
+    for (path, st), toks in zip(todo, results):
+        if toks is None:
+            continue
+        _INDEX_DOCS[path] = [st.st_mtime_ns, st.st_size, toks]
+        _post(path, toks)
+        dirty = True
+    if dirty:
+        _TERM_HITS.clear()
+        _save_index()
+
+
+def _word_term_hits(term: str) -> dict[str, list[int]]:
+    # path -> [substring count, first offset] for a term of word characters.
+    # Repeated terms reuse the result until a document is re-indexed.
+    hits = _TERM_HITS.get(term)
+    if hits is not None:
+        return hits
+    if len(_TERM_HITS) >= TERM_CACHE_SIZE:
+        del _TERM_HITS[next(iter(_TERM_HITS))]
+    hits = _TERM_HITS[term] = {}
+    for tok, posting in _POSTINGS.items():
+        if term not in tok:
+            continue
+        per_tok = tok.count(term)
+        at = tok.find(term)
+        for path, (tf, first) in posting.items():
+            h = hits.get(path)
+            if h is None:
+                hits[path] = [tf * per_tok, first + at]
+            else:
+                h[0] += tf * per_tok
+                if first + at < h[1]:
+                    h[1] = first + at
+    return hits
+
+
+def _term_candidates(term: str, paths: set[str]) -> set[str]:
+    # Documents that can contain a term with non-word characters: every word
+    # run of the term has to sit inside one of the document's tokens.
+    found = set(paths)
+    for run in TOKEN_RE.findall(term):
+        docs: set[str] = set()
+        for tok, posting in _POSTINGS.items():
+            if run in tok:
+                docs.update(posting)
+        found &= docs
+    return found
+
+
+def _automaton(terms) -> "ahocorasick.Automaton":
+    automaton = ahocorasick.Automaton()
+    for term in terms:
+        automaton.add_word(term, term)
+    automaton.make_automaton()
+    return automaton
+
+
+def _ac_counts(automaton, low: str) -> dict[str, list[int]]:
+    # term -> [count, first offset, end of last counted match] in one pass.
+    # The automaton reports overlapping matches; a term's match only counts
+    # if it starts after that term's previous counted one, as with str.count.
+    found: dict[str, list[int]] = {}
+    for end, term in automaton.iter(low):
+        start = end - len(term) + 1
+        h = found.get(term)
+        if h is None:
+            found[term] = [1, start, end + 1]
+        elif start >= h[2]:
+            h[0] += 1
+            h[2] = end + 1
+    return found
+
+
+def _top_ranked(scores: dict[str, list], key, n: int):
+    # The best n documents via a bounded heap; the rest of the ranking is
+    # only sorted if one of those could not be opened for its snippet.
+    top = heapq.nsmallest(n, scores, key=key)
+    yield from top
+    if len(top) == n:
+        yield from sorted(scores, key=key)[n:]
+
+
 def keyword_search(query: str, scope: str = "all", limit: int = 8) -> list[SearchHit]:
     q = (query or "").strip()
     if not q:
         return []
 
     terms = [t for t in re.split(r"\s+", q.lower()) if t]
-    hits: list[SearchHit] = []
+    paths = _iter_docs(scope)
+    order = {path: i for i, path in enumerate(paths)}
 
-    for doc in _iter_docs(scope):
-        try:
-            text = doc.read_text(encoding="utf-8", errors="replace")
-        except Exception:
-            continue
-        low = text.lower()
-        score = 0.0
-        first_idx = -1
+    term_hits: dict[str, dict[str, list[int]]] = {}
+    scan: dict[str, set[str]] = {}
+    with _INDEX_LOCK:
+        _sync_index(paths)
+        for term in set(terms):
+            if TOKEN_RE.fullmatch(term):
+                term_hits[term] = _word_term_hits(term)
+            else:
+                scan[term] = _term_candidates(term, set(order))
+
+    # Terms with non-word characters are counted in the candidate documents,
+    # each of which is opened once for all of its terms.
+    views: dict[str, str | mmap.mmap | None] = {}
+    try:
+        doc_terms: dict[str, list[str]] = {}
+        for term, candidates in scan.items():
+            term_hits[term] = {}
+            for path in candidates:
+                doc_terms.setdefault(path, []).append(term)
+        needles = {t: re.compile(re.escape(t.encode()), re.IGNORECASE) for t in scan if t.isascii()}
+        automaton = _automaton(scan) if ahocorasick is not None and len(scan) >= AC_MIN_TERMS else None
+        for path, dterms in doc_terms.items():
+            view = views[path] = _open_doc(path)
+            if view is None:
+                continue
+            if isinstance(view, str):
+                low = view.lower()
+                if automaton is not None:
+                    for term, (c, idx, _) in _ac_counts(automaton, low).items():
+                        term_hits[term][path] = [c, idx]
+                    continue
+                for term in dterms:
+                    c = low.count(term)
+                    if c:
+                        term_hits[term][path] = [c, low.find(term)]
+            else:
+                for term in dterms:
+                    needle = needles.get(term)
+                    found = needle.finditer(view) if needle is not None else iter(())
+                    m = next(found, None)
+                    if m:
+                        term_hits[term][path] = [1 + sum(1 for _ in found), m.start()]
+
+        scores: dict[str, list] = {}
         for term in terms:
-            c = low.count(term)
-            if c:
-                score += c
-                if first_idx < 0:
-                    first_idx = low.find(term)
-        if score <= 0:
-            continue
-        hits.append(
-            SearchHit(
-                doc_id=_doc_id(doc),
-                filename=doc.name,
-                score=float(score),
-                snippet=_snippet(text, first_idx),
+            for path, (c, idx) in term_hits[term].items():
+                if path not in order:
+                    continue
+                s = scores.get(path)
+                if s is None:
+                    scores[path] = [c, idx]
+                else:
+                    s[0] += c
+
+        n = max(1, min(limit, 30))
+        hits: list[SearchHit] = []
+        for path in _top_ranked(scores, lambda path: (-scores[path][0], order[path]), n):
+            if len(hits) >= n:
+                break
+            if path not in views:
+                views[path] = _open_doc(path)
+            if views[path] is None:
+                continue
+            doc = Path(path)
+            hits.append(
+                SearchHit(
+                    doc_id=_doc_id(doc),
+                    filename=doc.name,
+                    score=float(scores[path][0]),
+                    snippet=_view_snippet(views[path], scores[path][1]),
+                )
             )
-        )
+        return hits
+    finally:
+        for view in views.values():
+            if isinstance(view, mmap.mmap):
+                view.close()
+
+
+# Embedding index over fixed-size word chunks of every document, persisted
+# to SEMANTIC_DIR and refreshed per document by (mtime_ns, size) like the
+# keyword index. Vectors are L2-normalized, so inner product is cosine.
+# Rows are append-only: a changed document's new chunks are added with the
+# trained quantizer and its old rows are left dead until a background
+# compaction drops them. The fp32 embeddings are kept on disk, row-aligned in
+# vectors.f32, so compaction retrains from them instead of from int8 codes.
+_SEM_LOCK = threading.Lock()
+_SEM_MODEL_LOCK = threading.Lock()
+# None until first use; False if the model could not be loaded.
+_SEM_MODEL = None
+# path -> [mtime_ns, size, [chunk start offsets], first index row]
+_SEM_DOCS: dict[str, list] | None = None
+_SEM_INDEX = None
+# index row -> (path, chunk start offset), or None for a dead row
+_SEM_ROWS: list[tuple[str, int] | None] = []
+# True while a compaction is building the replacement index.
+_SEM_COMPACTING = False
+# Bumped whenever the index is rebuilt; cached hits of older generations are stale.
+_SEM_GEN = 0
+# query text -> embedding, least recently used first
+_SEM_QUERIES: dict[str, object] = {}
+# (query, scope, limit) -> (time, generation, query embedding, hits), least
+# recently used first
+_SEM_RESULTS: dict[tuple[str, str, int], tuple[float, int, object, list[SearchHit]]] = {}
 
-    hits.sort(key=lambda h: h.score, reverse=True)
-    return hits[: max(1, min(limit, 30))]
+
+def _semantic_model():
+    global _SEM_MODEL, faiss, np
+    if _SEM_MODEL is not None:
+        return _SEM_MODEL or None
+    # Its own lock, so concurrent first requests load the model once without
+    # holding _SEM_LOCK for the whole load.
+    with _SEM_MODEL_LOCK:
+        if _SEM_MODEL is None:
+            try:
+                import faiss as _faiss
+                import numpy as _np
+                from sentence_transformers import SentenceTransformer
+            except ImportError:  # optional; semantic_search falls back to keyword retrieval
+                _SEM_MODEL = False
+                return None
+            faiss, np = _faiss, _np
+            try:
+                _SEM_MODEL = SentenceTransformer(SEMANTIC_MODEL)
+            except Exception:
+                traceback.print_exc()
+                _SEM_MODEL = False
+    return _SEM_MODEL or None
+
+
+def _embed(model, texts: list[str]):
+    return model.encode(texts, batch_size=64, normalize_embeddings=True, convert_to_numpy=True).astype("float32")
+
+
+def _chunk_doc(text: str) -> tuple[list[int], list[str]]:
+    # Start offsets and texts of consecutive SEMANTIC_CHUNK_WORDS-word windows.
+    words = list(re.finditer(r"\S+", text))
+    offsets, chunks = [], []
+    for i in range(0, len(words), SEMANTIC_CHUNK_WORDS):
+        start = words[i].start()
+        end = words[min(i + SEMANTIC_CHUNK_WORDS, len(words)) - 1].end()
+        offsets.append(start)
+        chunks.append(text[start:end])
+    return offsets, chunks
+
+
+def _semantic_index(vectors, sq=None):
+    # 8-bit scalar quantization: a quarter of the fp32 storage and scan
+    # bandwidth. The per-dimension ranges are trained on a strided sample, or
+    # taken from sq (a trained quantizer) so decoded vectors re-encode to the
+    # same codes. Large corpora get an HNSW graph over the same int8 storage,
+    # so a query visits O(log n) vectors instead of all of them.
+    dim, qtype, metric = vectors.shape[1], faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_INNER_PRODUCT
+    if len(vectors) >= SEMANTIC_HNSW_MIN:
+        index = faiss.IndexHNSWSQ(dim, qtype, SEMANTIC_HNSW_M, metric)
+        index.hnsw.efConstruction = SEMANTIC_HNSW_EF_CONSTRUCTION
+        index.hnsw.efSearch = SEMANTIC_HNSW_EF_SEARCH
+        storage = faiss.downcast_index(index.storage)
+    else:
+        index = storage = faiss.IndexScalarQuantizer(dim, qtype, metric)
+    if sq is None:
+        step = max(1, len(vectors) // SEMANTIC_TRAIN_MAX)
+        index.train(vectors[::step])
+    else:
+        storage.sq = sq
+        storage.is_trained = index.is_trained = True
+    index.add(vectors)
+    return index
+
+
+def _semantic_sq(index):
+    return faiss.downcast_index(index.storage).sq if hasattr(index, "hnsw") else index.sq
+
+
+def _outside_trained_range(index, vectors) -> bool:
+    # QT_8bit stores per-dimension minimums, then ranges; values outside them
+    # are clipped when encoded.
+    trained = faiss.vector_to_array(_semantic_sq(index).trained)
+    vmin, vdiff = trained[:index.d], trained[index.d:]
+    return bool((vectors < vmin).any() or (vectors > vmin + vdiff).any())
+
+
+def _write_vectors(vectors, mode: str) -> None:
+    try:
+        SEMANTIC_DIR.mkdir(parents=True, exist_ok=True)
+        with (SEMANTIC_DIR / "vectors.f32").open(mode) as f:
+            f.write(vectors.tobytes())
+    except OSError:
+        pass  # without it, compaction re-encodes decoded codes instead
+
+
+def _read_vectors(start: int, count: int, dim: int):
+    with (SEMANTIC_DIR / "vectors.f32").open("rb") as f:
+        f.seek(start * dim * 4)
+        return np.fromfile(f, dtype="float32", count=count * dim).reshape(count, dim)
+
+
+def _set_semantic_rows() -> None:
+    rows: list[tuple[str, int] | None] = [None] * (_SEM_INDEX.ntotal if _SEM_INDEX is not None else 0)
+    for path, (_, _, offsets, first) in _SEM_DOCS.items():
+        rows[first:first + len(offsets)] = [(path, off) for off in offsets]
+    _SEM_ROWS[:] = rows
+
+
+def _load_semantic() -> None:
+    global _SEM_DOCS, _SEM_INDEX
+    _SEM_DOCS, _SEM_INDEX = {}, None
+    _SEM_ROWS.clear()
+    try:
+        meta = json_loads((SEMANTIC_DIR / "docs.json").read_bytes())
+        if meta.get("version") != SEMANTIC_VERSION or meta.get("model") != SEMANTIC_MODEL:
+            return
+        index = faiss.read_index(str(SEMANTIC_DIR / "index.faiss"))
+    except (OSError, ValueError, RuntimeError, AttributeError):
+        return
+    docs = meta.get("docs") or {}
+    if any(entry[2] and entry[3] + len(entry[2]) > index.ntotal for entry in docs.values()):
+        return
+    _SEM_DOCS, _SEM_INDEX = docs, index
+    _set_semantic_rows()
+
+
+def _save_semantic() -> None:
+    try:
+        SEMANTIC_DIR.mkdir(parents=True, exist_ok=True)
+        for name in ("index.faiss", "docs.json"):
+            (SEMANTIC_DIR / name).unlink(missing_ok=True)
+        if _SEM_INDEX is None:
+            return
+        faiss.write_index(_SEM_INDEX, str(SEMANTIC_DIR / "index.faiss"))
+        # docs.json is written last: an index without it is never loaded.
+        tmp = SEMANTIC_DIR / "docs.json.tmp"
+        tmp.write_bytes(json_line_bytes({"version": SEMANTIC_VERSION, "model": SEMANTIC_MODEL, "docs": _SEM_DOCS}))
+        os.replace(tmp, SEMANTIC_DIR / "docs.json")
+    except (OSError, RuntimeError):
+        pass  # read-only cache dir: keep the in-memory index only
+
+
+def _sync_semantic(model, paths: list[str]) -> None:
+    # Embed only documents whose (mtime_ns, size) changed and append their
+    # chunks; rows of changed or removed documents are marked dead.
+    global _SEM_DOCS, _SEM_INDEX, _SEM_GEN
+    if _SEM_DOCS is None:
+        _load_semantic()
+    stats: dict[str, os.stat_result] = {}
+    for path in paths:
+        try:
+            stats[path] = os.stat(path)
+        except OSError:
+            pass
+    stale = [
+        path for path, entry in _SEM_DOCS.items()
+        if path not in stats or entry[0] != stats[path].st_mtime_ns or entry[1] != stats[path].st_size
+    ]
+    for path in stale:
+        _, _, offsets, first = _SEM_DOCS.pop(path)
+        _SEM_ROWS[first:first + len(offsets)] = [None] * len(offsets)
+    todo = [path for path in stats if path not in _SEM_DOCS]
+    if not todo and not stale:
+        return
+
+    row = _SEM_INDEX.ntotal if _SEM_INDEX is not None else 0
+    texts: list[str] = []
+    for path in todo:
+        text = _read_doc(path)
+        if text is None:
+            continue
+        offsets, chunks = _chunk_doc(text)
+        st = stats[path]
+        _SEM_DOCS[path] = [st.st_mtime_ns, st.st_size, offsets, row]
+        _SEM_ROWS.extend((path, off) for off in offsets)
+        texts.extend(chunks)
+        row += len(offsets)
+    retrain = False
+    if texts:
+        vectors = _embed(model, texts)
+        if _SEM_INDEX is None:
+            _SEM_INDEX = _semantic_index(vectors)
+            _write_vectors(vectors, "wb")
+        else:
+            _SEM_INDEX.add(vectors)
+            _write_vectors(vectors, "ab")
+            retrain = _outside_trained_range(_SEM_INDEX, vectors)
+    _SEM_GEN += 1
+    _maybe_compact_semantic(retrain)
+    _save_semantic()
+
+
+def _maybe_compact_semantic(retrain: bool = False) -> None:
+    # Called under _SEM_LOCK. Rebuild without the dead rows once they pass
+    # SEMANTIC_COMPACT_DEAD of the index, when the live row count crossed
+    # SEMANTIC_HNSW_MIN, or (retrain) when new vectors fell outside the
+    # quantizer's trained range. The new index, the slow part for HNSW, is
+    # built on a thread, off the request path.
+    global _SEM_INDEX, _SEM_COMPACTING
+    if _SEM_INDEX is None or _SEM_COMPACTING:
+        return
+    live = [i for i, r in enumerate(_SEM_ROWS) if r is not None]
+    if not live:
+        _SEM_INDEX = None
+        for entry in _SEM_DOCS.values():
+            entry[3] = 0
+        _SEM_ROWS.clear()
+        return
+    dead = len(_SEM_ROWS) - len(live)
+    if (
+        not retrain
+        and dead <= len(_SEM_ROWS) * SEMANTIC_COMPACT_DEAD
+        and (len(live) >= SEMANTIC_HNSW_MIN) == hasattr(_SEM_INDEX, "hnsw")
+    ):
+        return
+    n = _SEM_INDEX.ntotal
+    try:
+        floats = os.stat(SEMANTIC_DIR / "vectors.f32").st_size == n * _SEM_INDEX.d * 4
+    except OSError:
+        floats = False
+    if not floats and retrain:
+        return  # clipped until the next cold build; the codes are all there is
+    # Without the fp32 file, decode the codes now (they can change once this
+    # lock is released) and re-encode them with the same quantizer.
+    decoded = None if floats else _SEM_INDEX.reconstruct_n(0, n)[live]
+    _SEM_COMPACTING = True
+    threading.Thread(
+        target=_compact_semantic,
+        args=(_SEM_INDEX, n, live, decoded),
+        name="memory-bridge-semantic-compact",
+        daemon=True,
+    ).start()
+
+
+def _compact_semantic(old, n: int, live: list[int], decoded) -> None:
+    # Rows added to old after its first n were snapshotted are carried over
+    # at the swap.
+    global _SEM_INDEX, _SEM_COMPACTING, _SEM_GEN
+    tmp = SEMANTIC_DIR / "vectors.f32.tmp"
+    try:
+        if decoded is None:
+            vectors = _read_vectors(0, n, old.d)[live]
+            new = _semantic_index(vectors)
+            tmp.write_bytes(vectors.tobytes())
+        else:
+            new = _semantic_index(decoded, _semantic_sq(old))
+        with _SEM_LOCK:
+            if _SEM_INDEX is not old:
+                return
+            if old.ntotal > n:
+                if decoded is None:
+                    tail = _read_vectors(n, old.ntotal - n, old.d)
+                    with tmp.open("ab") as f:
+                        f.write(tail.tobytes())
+                else:
+                    tail = old.reconstruct_n(n, old.ntotal - n)
+                new.add(tail)
+            if decoded is None:
+                os.replace(tmp, SEMANTIC_DIR / "vectors.f32")
+            remap = {r: i for i, r in enumerate(live)}
+            for entry in _SEM_DOCS.values():
+                first = entry[3]
+                entry[3] = remap.get(first, 0) if first < n else len(live) + first - n
+            _SEM_INDEX = new
+            _set_semantic_rows()
+            # A retrained quantizer shifts scores; drop the cached hits.
+            _SEM_GEN += 1
+            _save_semantic()
+    except Exception:
+        traceback.print_exc()
+    finally:
+        tmp.unlink(missing_ok=True)
+        with _SEM_LOCK:
+            _SEM_COMPACTING = False
+
+
+def _query_vector(model, q: str):
+    # Called under _SEM_LOCK.
+    vec = _SEM_QUERIES.pop(q, None)
+    if vec is None:
+        vec = _embed(model, [q])
+        if len(_SEM_QUERIES) >= SEMANTIC_CACHE_SIZE:
+            del _SEM_QUERIES[next(iter(_SEM_QUERIES))]
+    _SEM_QUERIES[q] = vec
+    return vec
+
+
+def _cached_hits(key: tuple[str, str, int], qvec) -> list[SearchHit] | None:
+    # Called under _SEM_LOCK: hits of this query, or of a near-duplicate one
+    # with the same scope and limit, if still current. A hit moves its entry
+    # to the most recently used end.
+    now = time.monotonic()
+    for k in [k for k, entry in _SEM_RESULTS.items() if entry[1] != _SEM_GEN or now - entry[0] > SEMANTIC_RESULT_TTL]:
+        del _SEM_RESULTS[k]
+    hit = key if key in _SEM_RESULTS else None
+    if hit is None:
+        for k, e in _SEM_RESULTS.items():
+            if k[1:] == key[1:] and float(qvec[0] @ e[2][0]) >= SEMANTIC_DUP_SCORE:
+                hit = k
+                break
+    if hit is None:
+        return None
+    entry = _SEM_RESULTS[hit] = _SEM_RESULTS.pop(hit)
+    return list(entry[3])
 
 
 def semantic_search(query: str, scope: str = "all", limit: int = 8) -> list[SearchHit]:
-    # Fallback semantic mode: keyword retrieval until embedding index endpoint is wired.
-    return keyword_search(query=query, scope=scope, limit=limit)
+    q = (query or "").strip()
+    if not q:
+        return []
+    model = _semantic_model()
+    if model is None:
+        # No embedding backend installed: keyword retrieval stands in.
+        return keyword_search(query=query, scope=scope, limit=limit)
+
+    paths = set(_iter_docs(scope))
+    n = max(1, min(limit, 30))
+    key = (q, (scope or "all").lower(), n)
+    best: dict[str, tuple[float, int]] = {}
+    with _SEM_LOCK:
+        # One index covers every scope; results are filtered to the asked one.
+        _sync_semantic(model, _iter_docs("all"))
+        gen = _SEM_GEN
+        qvec = _query_vector(model, q)
+        cached = _cached_hits(key, qvec)
+        if cached is not None:
+            return cached
+        if _SEM_INDEX is None:
+            return []
+
+        # Searched under the lock: the next sync adds to this same index.
+        # Best chunk per document, widening the search until n documents of
+        # the scope are found or the remaining chunks fall below
+        # SEMANTIC_MIN_SCORE; dead rows are skipped.
+        index = _SEM_INDEX
+        k = min(index.ntotal, n * 8)
+        while True:
+            best.clear()
+            scores, ids = index.search(qvec, k)
+            for score, i in zip(scores[0], ids[0]):
+                if i < 0 or score < SEMANTIC_MIN_SCORE:
+                    break
+                row = _SEM_ROWS[i]
+                if row is not None and row[0] in paths and row[0] not in best:
+                    best[row[0]] = (float(score), row[1])
+            if len(best) >= n or k >= index.ntotal or (len(scores[0]) and scores[0][-1] < SEMANTIC_MIN_SCORE):
+                break
+            k = min(index.ntotal, k * 4)
+
+    hits: list[SearchHit] = []
+    for path, (score, offset) in sorted(best.items(), key=lambda kv: -kv[1][0]):
+        if len(hits) >= n:
+            break
+        view = _open_doc(path)
+        if view is None:
+            continue
+        try:
+            doc = Path(path)
+            hits.append(
+                SearchHit(
+                    doc_id=_doc_id(doc),
+                    filename=doc.name,
+                    score=round(score, 4),
+                    snippet=_view_snippet(view, offset),
+                )
+            )
+        finally:
+            if isinstance(view, mmap.mmap):
+                view.close()
+    with _SEM_LOCK:
+        _SEM_RESULTS.pop(key, None)
+        if len(_SEM_RESULTS) >= SEMANTIC_CACHE_SIZE:
+            del _SEM_RESULTS[next(iter(_SEM_RESULTS))]
+        _SEM_RESULTS[key] = (time.monotonic(), gen, qvec, hits)
+    return list(hits)
 
 
 def get_doc(doc_id: str, max_chars: int = 8000) -> dict:
@@ -118,7 +906,10 @@ def get_doc(doc_id: str, max_chars: int = 8000) -> dict:
         raise ValueError("doc_id outside memory root")
     if not p.exists() or not p.is_file():
         raise FileNotFoundError(doc_id)
-    text = p.read_text(encoding="utf-8", errors="replace")
+    # Read at most one character past the limit instead of the whole file;
+    # text mode keeps read_text()'s decoding and newline translation.
+    with p.open(encoding="utf-8", errors="replace") as f:
+        text = f.read(max_chars + 1)
     return {
         "doc_id": doc_id,
         "filename": p.name,
@@ -127,10 +918,101 @@ def get_doc(doc_id: str, max_chars: int = 8000) -> dict:
     }
 
 
-def upsert_fact(payload: dict) -> dict:
-    FACTS_FILE.parent.mkdir(parents=True, exist_ok=True)
-    AUDIT_DIR.mkdir(parents=True, exist_ok=True)
+class _LogWriter(threading.Thread):
+    # Appends queued JSONL rows off the request path: one open/writelines per
+    # file per batch.
+
+    def __init__(self):
+        super().__init__(name="memory-bridge-log-writer", daemon=True)
+        self.rows: queue.Queue[tuple[Path, dict]] = queue.Queue()
+        # Long-lived O_APPEND descriptors, one per JSONL file.
+        self.fds: dict[Path, int] = {}
+
+    def run(self):
+        while True:
+            batch = [self.rows.get()]
+            deadline = time.monotonic() + LOG_BATCH_SEC
+            while len(batch) < LOG_BATCH_MAX:
+                wait = deadline - time.monotonic()
+                if wait <= 0:
+                    break
+                try:
+                    batch.append(self.rows.get(timeout=wait))
+                except queue.Empty:
+                    break
+            try:
+                self._write(batch)
+            except Exception:
+                traceback.print_exc()
+            finally:
+                for _ in batch:
+                    self.rows.task_done()
+
+    def _fd(self, path: Path) -> int:
+        # The cached descriptor is reused while it still refers to the file at
+        # path; process_entity_queue rewrites the queue with os.replace(), and
+        # appends to the replaced inode would be lost.
+        fd = self.fds.get(path)
+        if fd is not None:
+            try:
+                st = os.stat(path)
+                cur = os.fstat(fd)
+                if (st.st_dev, st.st_ino) == (cur.st_dev, cur.st_ino):
+                    return fd
+            except OSError:
+                pass
+            os.close(fd)
+            del self.fds[path]
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd = self.fds[path] = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        return fd
+
+    def _write(self, batch: list[tuple[Path, dict]]) -> None:
+        # Rows keep their queue order within each file.
+        by_file: dict[Path, list[bytes]] = {}
+        for path, row in batch:
+            by_file.setdefault(path, []).append(json_line_bytes(row))
+        for path, lines in by_file.items():
+            data = memoryview(b"".join(lines))
+            try:
+                fd = self._fd(path)
+                while data:
+                    data = data[os.write(fd, data):]
+            except OSError:
+                # The rows were already acknowledged to the caller; put the
+                # unwritten ones in the service log rather than dropping them,
+                # and let the other files in the batch go through.
+                traceback.print_exc()
+                fd = self.fds.pop(path, None)
+                if fd is not None:
+                    os.close(fd)
+                sys.stderr.write(f"memory_bridge: could not append to {path}; unwritten rows follow\n")
+                sys.stderr.write(bytes(data).decode("utf-8", "replace"))
+                sys.stderr.flush()
 
+
+_LOG_WRITER: _LogWriter | None = None
+_LOG_WRITER_LOCK = threading.Lock()
+
+
+def _append_rows(*rows: tuple[Path, dict]) -> None:
+    global _LOG_WRITER
+    with _LOG_WRITER_LOCK:
+        if _LOG_WRITER is None:
+            _LOG_WRITER = _LogWriter()
+            _LOG_WRITER.start()
+            atexit.register(flush_writes)
+    for item in rows:
+        _LOG_WRITER.rows.put(item)
+
+
+def flush_writes() -> None:
+    # Blocks until every queued JSONL row has been appended.
+    if _LOG_WRITER is not None:
+        _LOG_WRITER.rows.join()
+
+
+def upsert_fact(payload: dict) -> dict:
     now = int(time.time())
     row = {
         "ts": now,
@@ -142,9 +1024,6 @@ def upsert_fact(payload: dict) -> dict:
         "tags": payload.get("tags", []),
     }
 
-    with FACTS_FILE.open("a", encoding="utf-8") as f:
-        f.write(json.dumps(row, ensure_ascii=False) + "\n")
-
     audit = {
         "ts": now,
         "action": "upsert_fact",
@@ -152,15 +1031,13 @@ def upsert_fact(payload: dict) -> dict:
         "entity": row["entity"],
         "source": row["source"],
     }
-    with AUDIT_FILE.open("a", encoding="utf-8") as f:
-        f.write(json.dumps(audit, ensure_ascii=False) + "\n")
+    _append_rows((FACTS_FILE, row), (AUDIT_FILE, audit))
 
-    return {"ok": True, "written": str(FACTS_FILE), "audit": str(AUDIT_FILE)}
+    return {"ok": True, "queued": True, "written": str(FACTS_FILE), "audit": str(AUDIT_FILE)}
 
 
 def queue_entity(payload: dict) -> dict:
     queue_file = MEMORY_ROOT / "entity_request_queue.jsonl"
-    queue_file.parent.mkdir(parents=True, exist_ok=True)
     now = int(time.time())
     row = {
         "ts": now,
@@ -169,9 +1046,12 @@ def queue_entity(payload: dict) -> dict:
         "status": "incoming",
         "source": payload.get("source", "openclaw"),
     }
-    with queue_file.open("a", encoding="utf-8") as f:
-        f.write(json.dumps(row, ensure_ascii=False) + "\n")
-    return {"ok": True, "written": str(queue_file)}
+    _append_rows((queue_file, row))
+    return {"ok": True, "queued": True, "written": str(queue_file)}
+
+
+def _pid_file(script: str) -> Path:
+    return AUDIT_DIR / f"{Path(script).stem}.pid"
 
 
 def _start_service(cmd: list[str], log_name: str) -> dict:
@@ -179,29 +1059,72 @@ def _start_service(cmd: list[str], log_name: str) -> dict:
     log_path = AUDIT_DIR / log_name
     with log_path.open("a", encoding="utf-8") as logf:
         proc = subprocess.Popen(cmd, cwd=str(REPO_ROOT), stdout=logf, stderr=logf, start_new_session=True)
+    # Remembered so the next restart can stop exactly this process.
+    _pid_file(cmd[1]).write_text(str(proc.pid), encoding="utf-8")
     return {"pid": proc.pid, "log": str(log_path), "cmd": " ".join(cmd)}
 
 
+def _service_pids(script: str) -> list[int]:
+    # The instance recorded by _start_service, checked with ps (there is no
+    # /proc on macOS) in case its pid was reused. Instances started by hand
+    # have no pid file and are found the way pkill -f would find them.
+    try:
+        pid = int(_pid_file(script).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        pid = None
+    if pid is not None:
+        ps = subprocess.run(["ps", "-o", "command=", "-p", str(pid)], capture_output=True, text=True)
+        if script in ps.stdout:
+            return [pid]
+    found = subprocess.run(["pgrep", "-f", script], capture_output=True, text=True)
+    return [int(p) for p in found.stdout.split() if p.isdigit()]
+
+
+def _stop_service(script: str) -> None:
+    # SIGTERM the running instances and wait for them to exit so the
+    # replacement can bind the port.
+    pending = set()
+    for pid in _service_pids(script):
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            continue
+        if pid != os.getpid():
+            pending.add(pid)
+    deadline = time.monotonic() + STOP_TIMEOUT_SEC
+    while pending and time.monotonic() < deadline:
+        for pid in list(pending):
+            try:
+                # Reap it if this process started it, otherwise it stays a zombie.
+                if os.waitpid(pid, os.WNOHANG)[0]:
+                    pending.discard(pid)
+                    continue
+            except ChildProcessError:
+                pass
+            try:
+                os.kill(pid, 0)
+            except ProcessLookupError:
+                pending.discard(pid)
+        if pending:
+            time.sleep(0.05)
+
+
 def restart(service: str = "all", wiki_port: int = 8889, api_port: int = 8091) -> dict:
     service = (service or "all").lower()
+    # Restarting the API kills this process; land queued rows first.
+    flush_writes()
     actions = []
 
     if service in {"all", "wiki"}:
-        pat = str(REPO_ROOT / "05_serving" / "knowledge_wiki_server.py")
-        subprocess.run(["pkill", "-f", pat], capture_output=True)
-        started = _start_service(
-            ["python3", str(REPO_ROOT / "05_serving" / "knowledge_wiki_server.py"), "--port", str(wiki_port)],
-            "knowledge_wiki_server.log",
-        )
+        script = str(REPO_ROOT / "05_serving" / "knowledge_wiki_server.py")
+        _stop_service(script)
+        started = _start_service(["python3", script, "--port", str(wiki_port)], "knowledge_wiki_server.log")
         actions.append({"service": "wiki", "status": "restarted", **started})
 
     if service in {"all", "api"}:
-        pat = str(REPO_ROOT / "05_serving" / "memory_api_server.py")
-        subprocess.run(["pkill", "-f", pat], capture_output=True)
-        started = _start_service(
-            ["python3", str(REPO_ROOT / "05_serving" / "memory_api_server.py"), "--port", str(api_port)],
-            "memory_api_server.log",
-        )
+        script = str(REPO_ROOT / "05_serving" / "memory_api_server.py")
+        _stop_service(script)
+        started = _start_service(["python3", script, "--port", str(api_port)], "memory_api_server.log")
         actions.append({"service": "api", "status": "restarted", **started})
 
     return {"ok": True, "service": service, "actions": actions}
@@ -209,6 +1132,8 @@ def restart(service: str = "all", wiki_port: int = 8889, api_port: int = 8091) -
 
 def rebuild(target: str = "", scope: str = "all") -> dict:
     scope = (scope or "all").lower()
+    # The build scripts read the queue and fact files.
+    flush_writes()
     cmds: list[list[str]] = []
 
     kb_cmd = ["python3", str(REPO_ROOT / "03_organization" / "build_campaign_kb.py")]
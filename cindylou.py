@@ -7,18 +7,12 @@ import sys
 from pathlib import Path
 
 REPO_ROOT = Path(__file__).resolve().parent
-if str(REPO_ROOT) not in sys.path:
-    sys.path.insert(0, str(REPO_ROOT))
-
-import importlib.util
-
-_bridge_path = REPO_ROOT / "05_serving" / "memory_bridge.py"
-_spec = importlib.util.spec_from_file_location("memory_bridge", _bridge_path)
-if _spec is None or _spec.loader is None:
-    raise RuntimeError(f"Unable to load memory bridge module: {_bridge_path}")
-_mod = importlib.util.module_from_spec(_spec)
-sys.modules[_spec.name] = _mod
-_spec.loader.exec_module(_mod)
+SERVING_DIR = REPO_ROOT / "05_serving"
+for _p in (REPO_ROOT, SERVING_DIR):
+    if str(_p) not in sys.path:
+        sys.path.insert(0, str(_p))
+
+import memory_bridge as _mod
 
 get_doc = _mod.get_doc
 keyword_search = _mod.keyword_search
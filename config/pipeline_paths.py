@@ -5,6 +5,7 @@ from __future__ import annotations
 
 import os
 from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
 
 
@@ -21,18 +22,20 @@ DEFAULTS = {
 }
 
 
+@lru_cache(maxsize=None)
 def _load_dotenv(path: Path = ENV_FILE) -> None:
+    # Parsed once per process: it only fills keys missing from os.environ, so
+    # a second pass over the same file could not change anything.
     if not path.exists():
         return
     for raw in path.read_text(encoding="utf-8", errors="replace").splitlines():
         line = raw.strip()
-        if not line or line.startswith("#") or "=" not in line:
+        if not line or line[0] == "#":
             continue
-        key, val = line.split("=", 1)
+        key, sep, val = line.partition("=")
         key = key.strip()
-        val = val.strip().strip('"').strip("'")
-        if key and key not in os.environ:
-            os.environ[key] = val
+        if sep and key and key not in os.environ:
+            os.environ[key] = val.strip().strip('"').strip("'")
 
 
 @dataclass(frozen=True)
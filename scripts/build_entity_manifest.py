@@ -1,5 +1,7 @@
 #!/usr/bin/env python3
 from pathlib import Path
 import runpy
+import sys
 
-runpy.run_path(str(Path(__file__).resolve().parents[1] / '03_organization' / 'build_entity_manifest.py'), run_name='__main__')
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / '03_organization'))
+runpy.run_module('build_entity_manifest', run_name='__main__', alter_sys=True)
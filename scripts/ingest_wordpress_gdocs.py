@@ -1,5 +1,7 @@
 #!/usr/bin/env python3
 from pathlib import Path
 import runpy
+import sys
 
-runpy.run_path(str(Path(__file__).resolve().parents[1] / '01_ingestion' / 'ingest_wordpress_gdocs.py'), run_name='__main__')
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / '01_ingestion'))
+runpy.run_module('ingest_wordpress_gdocs', run_name='__main__', alter_sys=True)